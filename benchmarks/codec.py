@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compare the previous legacy key codec (`assoc_in` and `deep_merge` per key)
+with the single-pass codec of `graffiti.legacy.keys` on flat results.
+
+    $ python -m benchmarks.codec --sizes 1000 10000
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from graffiti import util
+from graffiti.legacy import keys
+
+__author__ = "Michael-Keith Bernard"
+
+def flat(size, separator="__"):
+    """`size` keys three levels deep, in groups of 10 sharing a prefix"""
+
+    return { separator.join(["g{}".format(i // 10), "h{}".format(i % 2),
+                             "k{}".format(i)]): i for i in range(size) }
+
+def merging(d, separator="__"):
+    """The previous `keys.expand_keys`"""
+
+    acc = {}
+    for k, v in d.items():
+        acc = util.deep_merge(acc, keys.expand_key(k, v, separator))
+    return acc
+
+def nesting(d, separator="__"):
+    """The previous `keys.simplify`"""
+
+    def _simplifier(d, prefix):
+        acc = {}
+        for k, v in d.items():
+            name = separator.join(prefix + [k])
+            if isinstance(v, dict):
+                acc = util.merge(acc, _simplifier(v, prefix + [k]))
+            else:
+                acc[name] = v
+        return acc
+
+    return _simplifier(d, [])
+
+def measure(fn, args, repeat):
+    return min(timeit.repeat(lambda: fn(*args), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    opts = parser.parse_args()
+
+    row = "{:<12} {:>7} {:>12} {:>12} {:>12}"
+    print(row.format("operation", "keys", "previous s", "trie s",
+                     "cached s"))
+    for size in opts.sizes:
+        d = flat(size)
+        table = keys.split_table(d)
+        print(row.format("desimplify", size,
+                         "{:.4f}".format(measure(merging, (d,), opts.repeat)),
+                         "{:.4f}".format(measure(keys.expand_keys, (d,),
+                                                 opts.repeat)),
+                         "{:.4f}".format(measure(keys.expand_keys,
+                                                 (d, "__", table),
+                                                 opts.repeat))))
+
+        nested = keys.desimplify(d)
+        print(row.format("simplify", size,
+                         "{:.4f}".format(measure(nesting, (nested,),
+                                                 opts.repeat)),
+                         "{:.4f}".format(measure(keys.simplify, (nested,),
+                                                 opts.repeat)),
+                         "-"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Compare two result files written by `benchmarks.suite`, flagging metrics
+that got worse by more than a threshold. Exits with status 1 on regressions.
+
+    $ python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+__author__ = "Michael-Keith Bernard"
+
+# metric -> True if bigger is better
+METRICS = {
+    "compile_s": False,
+    "latency_s": False,
+    "calls_per_s": True,
+    "peak_bytes": False,
+}
+
+def load(filename):
+    """The metadata of a suite run and its results keyed by
+    `(backend, shape, size)`
+    """
+
+    with open(filename) as f:
+        data = json.load(f)
+    return data["meta"], { (r["backend"], r["shape"], r["size"]): r
+                           for r in data["results"] }
+
+def change(metric, before, after):
+    """Relative change of `metric`, positive when it got worse"""
+
+    if not before:
+        return 0.0
+    delta = (after - before) / float(before)
+    return -delta if METRICS[metric] else delta
+
+def compare(before, after, threshold, metrics=METRICS):
+    """Yields `(case, metric, before, after, change, regressed)` for every
+    metric measured in both `before` and `after`
+    """
+
+    for case in sorted(set(before) & set(after)):
+        old, new = before[case], after[case]
+        for metric in sorted(metrics):
+            if metric in old and metric in new:
+                c = change(metric, old[metric], new[metric])
+                yield case, metric, old[metric], new[metric], c, c > threshold
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change counted as a regression")
+    opts = parser.parse_args()
+
+    (old_meta, before), (new_meta, after) = load(opts.before), load(opts.after)
+    metrics = dict(METRICS)
+    if old_meta.get("memory") != new_meta.get("memory"):
+        print("Memory was measured differently, not comparing peak_bytes")
+        del metrics["peak_bytes"]
+
+    row = "{:<7} {:<9} {:>6} {:<12} {:>12} {:>12} {:>8}"
+    print(row.format("backend", "shape", "size", "metric", "before", "after",
+                     "change"))
+
+    regressions = 0
+    for case, metric, old, new, c, regressed in compare(
+            before, after, opts.threshold, metrics):
+        regressions += regressed
+        print(row.format(case[0], case[1], case[2], metric,
+                         "{:.4g}".format(old), "{:.4g}".format(new),
+                         "{:+.1%}".format(c)),
+              "REGRESSION" if regressed else "")
+
+    print("{} regression(s)".format(regressions))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
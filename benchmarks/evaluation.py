@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compare the copying evaluator (`reduce` over `core.call_with`) with the
+in-place evaluator (`core.evaluate`) on chains and wide graphs.
+
+    $ python -m benchmarks.evaluation --sizes 1000 10000
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+from functools import reduce
+
+from benchmarks.graphs import node
+from graffiti import core
+from graffiti import util
+
+__author__ = "Michael-Keith Bernard"
+
+def chain(size):
+    """n1 <- n0, n2 <- n1, ..., returns `(schema, strategy, env)`"""
+
+    keys = ["n{}".format(i) for i in range(size + 1)]
+    schema = { k: util.fninfo(node(p)) for p, k in zip(keys, keys[1:]) }
+    return schema, keys[1:], { keys[0]: 0 }
+
+def wide(size):
+    """n0 <- x, n1 <- x, ..., returns `(schema, strategy, env)`"""
+
+    keys = ["n{}".format(i) for i in range(size)]
+    schema = { k: util.fninfo(node("x")) for k in keys }
+    return schema, keys, { "x": 0 }
+
+def copying(schema, strategy, env):
+    return reduce(core.call_with(schema), strategy, dict(env))
+
+def in_place(schema, strategy, env):
+    return core.evaluate(schema, strategy, dict(env))
+
+def measure(fn, args, repeat):
+    return min(timeit.repeat(lambda: fn(*args), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    opts = parser.parse_args()
+
+    row = "{:<6} {:>7} {:>12} {:>12} {:>12} {:>12}"
+    print(row.format("shape", "nodes", "copying s", "us/node",
+                     "in-place s", "us/node"))
+    for shape in (chain, wide):
+        for size in opts.sizes:
+            args = shape(size)
+            old = measure(copying, args, opts.repeat)
+            new = measure(in_place, args, opts.repeat)
+            print(row.format(shape.__name__, size,
+                             "{:.4f}".format(old),
+                             "{:.2f}".format(old / size * 1e6),
+                             "{:.4f}".format(new),
+                             "{:.2f}".format(new / size * 1e6)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Synthetic graph descriptors for benchmarks. Each generator returns the pair
+`(descriptor, inputs)`, where nodes take the names of their dependencies as
+arguments. With `legacy=True` nested names are flattened the way
+`graffiti.legacy` expects (eg "g__a")
+"""
+
+import random
+
+__author__ = "Michael-Keith Bernard"
+
+def node(*args):
+    """Make a node function taking exactly `args`"""
+
+    return eval("lambda {}: 0".format(", ".join(args)))
+
+def chain(size, legacy=False):
+    """n1 <- n0, n2 <- n1, ..."""
+
+    keys = ["n{}".format(i) for i in range(size + 1)]
+    return { k: node(p) for p, k in zip(keys, keys[1:]) }, { keys[0]: 0 }
+
+def fan(size, legacy=False, arity=16):
+    """n0 <- x, ..., n{size} <- x, joined back together by a tree of nodes each
+    taking up to `arity` arguments
+    """
+
+    desc = { "n{}".format(i): node("x") for i in range(size) }
+    layer, level = sorted(desc), 0
+    while len(layer) > 1:
+        joined = []
+        for i in range(0, len(layer), arity):
+            name = "j{}_{}".format(level, i // arity)
+            desc[name] = node(*layer[i:i + arity])
+            joined.append(name)
+        layer, level = joined, level + 1
+    return desc, { "x": 0 }
+
+def random_dag(size, legacy=False, degree=3, seed=0):
+    """Each node depends on up to `degree` random earlier nodes (or the input)"""
+
+    rng = random.Random(seed)
+    keys = ["x"] + ["n{}".format(i) for i in range(size)]
+    desc = {}
+    for i, k in enumerate(keys[1:], 1):
+        args = rng.sample(keys[:i], min(degree, i))
+        desc[k] = node(*sorted(args))
+    return desc, { "x": 0 }
+
+def diamonds(size, legacy=False):
+    """`size // 3` diamonds in a row, t <- l, r <- b, where each bottom is the
+    top of the next diamond
+    """
+
+    desc, top = {}, "t"
+    for i in range(size // 3):
+        left, right, bottom = ("l{}".format(i), "r{}".format(i),
+                               "b{}".format(i))
+        desc[left], desc[right] = node(top), node(top)
+        desc[bottom] = node(left, right)
+        top = bottom
+    return desc, { "t": 0 }
+
+def nested(size, legacy=False, width=10):
+    """Graphs nested `size // width` deep, each level a chain of `width` nodes
+    starting from the input
+    """
+
+    def _level(depth, prefix):
+        name = lambda k: "__".join(prefix + [k]) if legacy else k
+        keys = ["a{}".format(i) for i in range(width)]
+        desc = { keys[0]: node("x") }
+        for p, k in zip(keys, keys[1:]):
+            desc[k] = node(name(p))
+        if depth > 1:
+            desc["g"] = _level(depth - 1, prefix + ["g"])
+        return desc
+
+    return _level(max(size // width, 1), []), { "x": 0 }
+
+SHAPES = {
+    "chain": chain,
+    "fan": fan,
+    "random": random_dag,
+    "diamonds": diamonds,
+    "nested": nested,
+}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Compare peak memory of a graph evaluation with and without releasing
+intermediate values (`_release=True`).
+
+    $ python -m benchmarks.memory --size 1000000
+"""
+
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import resource
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from graffiti import Graph
+
+__author__ = "Michael-Keith Bernard"
+
+def pipeline():
+    """A chain of large intermediate lists reduced to a single number"""
+
+    return Graph({
+        "xs": lambda n: list(range(n)),
+        "shifted": lambda xs: [x + 1 for x in xs],
+        "squares": lambda shifted: [x * x for x in shifted],
+        "scaled": lambda squares: [x * 0.5 for x in squares],
+        "total": lambda scaled: sum(scaled),
+    })
+
+def _peak_rss(fn, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    fn()
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((after - before) * 1024)
+
+def peak(fn):
+    """Peak bytes allocated while calling `fn`. Uses tracemalloc where it's
+    available, otherwise the growth in max RSS of a forked child process
+    """
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_peak_rss, args=(fn, queue))
+    child.start()
+    res = queue.get()
+    child.join()
+    return res
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000000)
+    opts = parser.parse_args()
+
+    graph = pipeline()
+    call = lambda release: lambda: graph(
+        n=opts.size, _keys={ "total" }, _release=release)
+
+    kept, released = peak(call(False)), peak(call(True))
+    row = "{:<10} {:>12}"
+    print(row.format("mode", "peak MiB"))
+    print(row.format("kept", "{:.1f}".format(kept / 2.0 ** 20)))
+    print(row.format("released", "{:.1f}".format(released / 2.0 ** 20)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compare the exhaustive legacy requirements search with the reachability
+planner of `graffiti.legacy.strategy` on keyed calls of synthetic graphs.
+
+    $ python -m benchmarks.planning --sizes 8 1000 5000
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from benchmarks.graphs import SHAPES
+from graffiti import util
+from graffiti.legacy import core
+from graffiti.legacy import keys
+from graffiti.legacy import strategy
+
+__author__ = "Michael-Keith Bernard"
+
+def exhaustive(nodes, key, init=None):
+    """The previous `strategy.requirements_for`: tries every order in which
+    satisfiable nodes could be evaluated, exponential in the graph's width
+    """
+
+    def _search(state, path):
+        if key in state:
+            return [path]
+
+        opts = strategy.satisfied_by(nodes, state) - state
+        paths = (_search(state | { opt }, path + [opt]) for opt in opts)
+        return util.concat(*[p for p in paths])
+
+    return set(min(_search(set(init or []), []), key=len))
+
+def reachability(nodes, key, init=None):
+    return strategy.requirements_for(nodes, key, init)
+
+def sink(nodes):
+    """The last (by name) node that no other node depends on, which is the
+    deepest one in all generated shapes
+    """
+
+    used = set(util.concat1(v["required"] for v in nodes.values()))
+    return max((k for k in nodes if k not in used), key=lambda k: (len(k), k))
+
+def measure(fn, args, repeat):
+    return min(timeit.repeat(lambda: fn(*args), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[8, 1000, 5000])
+    parser.add_argument("--shapes", nargs="+", default=sorted(SHAPES),
+                        choices=sorted(SHAPES))
+    parser.add_argument("--exhaustive", type=int, default=10,
+                        help="largest size to run the exhaustive search on")
+    parser.add_argument("--repeat", type=int, default=3)
+    opts = parser.parse_args()
+
+    row = "{:<9} {:>7} {:>12} {:>14} {:>12}"
+    print(row.format("shape", "nodes", "required", "exhaustive s",
+                     "reachable s"))
+    for shape in opts.shapes:
+        for size in opts.sizes:
+            descriptor, inputs = SHAPES[shape](size, legacy=True)
+            nodes = core.build_nodes(keys.simplify(descriptor))
+            key = sink(nodes)
+            args = (nodes, key, set(inputs))
+
+            old = "-"
+            if len(nodes) <= opts.exhaustive:
+                old = "{:.6f}".format(measure(exhaustive, args, opts.repeat))
+            new = measure(reachability, args, opts.repeat)
+            print(row.format(shape, len(nodes), len(reachability(*args)), old,
+                             "{:.6f}".format(new)))
+
+if __name__ == "__main__":
+    main()
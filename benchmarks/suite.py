@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmark compiling and calling synthetic graphs with `graffiti.core` and
+`graffiti.legacy`, writing the results as JSON for `benchmarks.compare`.
+
+    $ python -m benchmarks.suite --sizes 10 100 1000 --output results.json
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import time
+from timeit import default_timer
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from benchmarks.graphs import SHAPES
+
+__author__ = "Michael-Keith Bernard"
+
+def core_backend(descriptor):
+    """Returns the pair `(compile, call)` of thunks for `graffiti.core`"""
+
+    from graffiti import core
+
+    graph = core.compile_graph(descriptor)
+    return (lambda: core.compile_graph(descriptor),
+            lambda inputs: graph(dict(inputs)))
+
+def codegen_backend(descriptor):
+    """Returns the pair `(compile, call)` of thunks for `graffiti.core` with
+    generated plan functions
+    """
+
+    from graffiti import core
+
+    graph = core.compile_graph(descriptor, codegen=True)
+    return (lambda: core.compile_graph(descriptor, codegen=True),
+            lambda inputs: graph(dict(inputs)))
+
+def flat_backend(descriptor):
+    """Returns the pair `(compile, call)` of thunks for `graffiti.core` with
+    nested graphs flattened into their parent
+    """
+
+    from graffiti import core
+
+    graph = core.compile_graph(descriptor, flatten=True)
+    return (lambda: core.compile_graph(descriptor, flatten=True),
+            lambda inputs: graph(dict(inputs)))
+
+def legacy_backend(descriptor):
+    """Returns the pair `(compile, call)` of thunks for `graffiti.legacy`"""
+
+    from graffiti.legacy import core
+
+    graph = core.compile_graph(descriptor)
+    return (lambda: core.compile_graph(descriptor),
+            lambda inputs: core.run_graph(graph, dict(inputs)))
+
+BACKENDS = {
+    "core": core_backend,
+    "codegen": codegen_backend,
+    "flat": flat_backend,
+    "legacy": legacy_backend,
+}
+
+def peak(fn):
+    """Peak bytes allocated by `fn`, measured with tracemalloc if available,
+    otherwise the growth of the max RSS of this process
+    """
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    fn()
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024
+
+def best(fn, repeat):
+    """Shortest time taken by `fn` over `repeat` calls"""
+
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        fn()
+        times.append(default_timer() - start)
+    return min(times)
+
+def throughput(fn, duration):
+    """Calls of `fn` per second, calling it for at least `duration` seconds"""
+
+    calls, start = 0, default_timer()
+    while True:
+        fn()
+        calls += 1
+        elapsed = default_timer() - start
+        if elapsed >= duration:
+            return calls / elapsed
+
+def measure(backend, shape, size, repeat, duration):
+    """Measure one backend on one generated graph"""
+
+    descriptor, inputs = SHAPES[shape](size, legacy=backend == "legacy")
+    compile_graph, call = BACKENDS[backend](descriptor)
+
+    return {
+        "peak_bytes": peak(lambda: call(inputs)),
+        "compile_s": best(compile_graph, repeat),
+        "latency_s": best(lambda: call(inputs), repeat),
+        "calls_per_s": throughput(lambda: call(inputs), duration),
+    }
+
+def _child(queue, args):
+    try:
+        queue.put(measure(*args))
+    except BaseException as e:
+        queue.put({ "error": "{}: {}".format(type(e).__name__, e)[:200] })
+
+def isolated(args, timeout):
+    """Run `measure(*args)` in a child process, so slow cases can be abandoned
+    after `timeout` seconds and memory measurements don't interfere
+    """
+
+    if hasattr(multiprocessing, "get_context"):
+        ctx = multiprocessing.get_context("fork")
+    else:
+        ctx = multiprocessing
+    queue = ctx.Queue()
+    child = ctx.Process(target=_child, args=(queue, args))
+    child.start()
+    try:
+        return queue.get(timeout=timeout)
+    except Empty:
+        child.terminate()
+        return { "error": "timeout after {}s".format(timeout) }
+    finally:
+        child.join()
+
+def revision():
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])
+        return out.decode("ascii").strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--shapes", nargs="+", default=sorted(SHAPES),
+                        choices=sorted(SHAPES))
+    parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS),
+                        choices=sorted(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=0.2,
+                        help="seconds spent measuring calls per second")
+    parser.add_argument("--timeout", type=float, default=10,
+                        help="seconds before abandoning a single case")
+    parser.add_argument("--output", help="file to write JSON results to")
+    opts = parser.parse_args()
+
+    row = "{:<7} {:<9} {:>6} {:>11} {:>11} {:>11} {:>11}"
+    print(row.format("backend", "shape", "size", "compile ms", "call ms",
+                     "calls/s", "peak KiB"))
+
+    results = []
+    for shape in opts.shapes:
+        for size in opts.sizes:
+            for backend in opts.backends:
+                res = isolated((backend, shape, size, opts.repeat,
+                                opts.duration), opts.timeout)
+                res.update(backend=backend, shape=shape, size=size)
+                results.append(res)
+                if "error" in res:
+                    print(row.format(backend, shape, size, "-", "-", "-", "-"),
+                          res["error"])
+                else:
+                    print(row.format(backend, shape, size,
+                                     "{:.3f}".format(res["compile_s"] * 1e3),
+                                     "{:.3f}".format(res["latency_s"] * 1e3),
+                                     "{:.0f}".format(res["calls_per_s"]),
+                                     "{:.0f}".format(res["peak_bytes"] / 1024.)))
+
+    if opts.output:
+        meta = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "revision": revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "memory": "tracemalloc" if tracemalloc is not None else "maxrss",
+        }
+        with open(opts.output, "w") as f:
+            json.dump({ "meta": meta, "results": results }, f, indent=2,
+                      sort_keys=True)
+
+if __name__ == "__main__":
+    main()
@@ -19,29 +19,80 @@
 
 from pprint import pformat
 
+from graffiti import core
+from graffiti import util
+from graffiti.analyze import analyze
+from graffiti.batch import batched, map_graph
+from graffiti.cache import (LRUCache, TTLCache, TieredCache, DirectoryStore,
+                            cached)
 from graffiti.core import compile_graph
+from graffiti.hooks import Hooks, Collector
+from graffiti.lazy import LazyResult
+from graffiti.stream import stream
 
 __author__ = "Michael-Keith Bernard"
+__all__ = ["Graph", "compile_graph", "LRUCache", "TTLCache", "TieredCache",
+           "DirectoryStore", "cached", "batched", "Hooks", "Collector"]
 
 class Graph(object):
-    def __init__(self, descriptor=None):
+    def __init__(self, descriptor=None, executor=None, hooks=None,
+                 codegen=False, flatten=False):
         self.graph = {} if descriptor is None else descriptor
+        self.executor = executor
+        self.hooks = hooks
+        self.codegen = codegen
+        self.flatten = flatten
         self._compiled = None
+        self._dirty = set()
+        self._path = ()
 
     def compile(self):
-        """Compile graph and all sub-graph objects"""
+        """Compile graph and all sub-graph objects. Sub-graphs that are already
+        compiled and unchanged are reused
+        """
 
-        for v in self.graph.values():
-            if isinstance(v, Graph):
-                v.compile()
-        self._compiled = compile_graph(self.graph)
+        self._place_subgraphs(self.graph)
+        self._compiled = compile_graph(self.graph, self.executor,
+                                       hooks=self.hooks, codegen=self.codegen,
+                                       flatten=self.flatten, path=self._path)
+        self._dirty = set()
         return self._compiled
 
+    def _place(self, path):
+        """Move this graph to `path` from the root graph, which its node caches
+        are bound to
+        """
+
+        if self._path != path:
+            self._path = path
+            self._compiled = None
+        self._check_compiled()
+
+    def _place_subgraphs(self, keys):
+        for k in keys:
+            v = self.graph.get(k)
+            if isinstance(v, Graph):
+                v._place(self._path + (k,))
+
     def _check_compiled(self):
-        """Check for compiled graph, otherwise recompile"""
+        """Check for compiled graph, otherwise recompile. If only some nodes
+        changed since the last compile, only those are recompiled (see
+        `graffiti.core.recompile`)
+        """
 
         if self._compiled is None:
             self.compile()
+        elif self._dirty:
+            self._place_subgraphs(self._dirty)
+            self._compiled = core.recompile(self._compiled, self.graph,
+                                            self._dirty)
+            self._dirty = set()
+
+    def _changed(self, name):
+        """Mark the node `name` as added, replaced or deleted"""
+
+        if self._compiled is not None:
+            self._dirty.add(name)
 
     @property
     def _schema(self):
@@ -51,20 +102,96 @@ class Graph(object):
         return self._compiled._schema
 
     def __call__(self, *args, **kwargs):
-        """Apply the graph, passing args and kwargs straight through"""
+        """Apply the graph, passing args and kwargs straight through. Pass
+        `_executor` to evaluate independent nodes concurrently, and `_hooks`
+        (see `graffiti.hooks.Hooks`) to observe each node call
+        """
 
         self._check_compiled()
         return self._compiled(*args, **kwargs)
 
-    def add_node(self, name, func):
-        self._compiled = None
-        self.graph[name] = func
+    def acall(self, *args, **kwargs):
+        """Apply the graph on the running asyncio event loop, awaiting
+        coroutine nodes concurrently. See `graffiti.aio.acall`
+        """
+
+        from graffiti.aio import acall
+        self._check_compiled()
+        return acall(self._compiled, *args, **kwargs)
+
+    def lazy(self, _env=None, _hooks=None, **kwargs):
+        """Apply the graph lazily: returns a read-only mapping that evaluates
+        each node on first access. See `graffiti.lazy.LazyResult`
+        """
+
+        self._check_compiled()
+        return LazyResult(self._compiled, util.merge(_env or {}, kwargs),
+                          hooks=_hooks)
+
+    def map(self, inputs, _keys=None, _prune_keys=False, _hooks=None):
+        """Apply the graph to each input dict in `inputs`, evaluating every node
+        once across the batch. See `graffiti.batch.map_graph`
+        """
+
+        self._check_compiled()
+        return map_graph(self._compiled, inputs, _keys, _prune_keys, _hooks)
+
+    def stream(self, inputs, _keys=None, _prune_keys=False, _executor=None,
+               window=16, _hooks=None):
+        """Lazily apply the graph to each input dict from the iterable
+        `inputs`, keeping at most `window` records in flight. See
+        `graffiti.stream.stream`
+        """
+
+        self._check_compiled()
+        if _executor is None:
+            _executor = self.executor
+        return stream(self._compiled, inputs, _keys, _prune_keys, _executor,
+                      window, _hooks)
+
+    def update(self, previous, changed, _hooks=None):
+        """Recompute a previous result of this graph after the inputs in
+        `changed` changed, re-evaluating only the affected nodes
+        """
+
+        self._check_compiled()
+        return core.update(self._compiled._schema, previous, changed,
+                           core.graph_hooks(self._compiled, _hooks))
+
+    def warm(self, keys=None, inputs=()):
+        """Pre-compute the execution plan for requesting `keys` given the input
+        names in `inputs`
+        """
+
+        self._check_compiled()
+        core.warm(self._compiled._schema, keys, inputs)
+
+    @property
+    def plan_stats(self):
+        """Hit/miss counters of the execution plan cache, or None if plans
+        aren't cached
+        """
+
+        self._check_compiled()
+        plans = self._compiled._schema["plans"]
+        return None if plans is None else plans.stats
+
+    @property
+    def cache_stats(self):
+        """Hit/miss/eviction counters of each cached node"""
+
+        self._check_compiled()
+        return core.cache_stats(self._compiled._schema)
+
+    def add_node(self, name, func, cache=None):
+        self._changed(name)
+        self.graph[name] = func if cache is None else cached(cache)(func)
 
     def del_node(self, name):
-        self._compiled = None
+        self._changed(name)
         del self.graph[name]
 
-    def node(self, func_or_name):
+    def node(self, func_or_name, cache=None):
         """Node decorator
 
         g = Graph()
@@ -76,16 +203,18 @@ class Graph(object):
         @g.node
         def bar(mydep2):
             return somethingelse(mydep2)
-        """
 
-        self._compiled = None
+        @g.node("baz", cache=LRUCache(1000))
+        def baz(mydep1):
+            return expensive(mydep1)
+        """
 
         def _decorator(fn):
-            self.graph[func_or_name] = fn
+            self.add_node(func_or_name, fn, cache)
             return fn
 
         if callable(func_or_name):
-            self.graph[func_or_name.func_name] = func_or_name
+            self.add_node(func_or_name.__name__, func_or_name, cache)
             return func_or_name
         else:
             return _decorator
@@ -93,21 +222,61 @@ class Graph(object):
     def subgraph(self, name):
         """Create a sub-graph element at `name`"""
 
-        self._compiled = None
+        self._changed(name)
         sub = Graph()
         self.graph[name] = sub
         return sub
 
+    def save(self, filename):
+        """Write the compiled graph to `filename`, so `Graph.load` can restore
+        it without analysing every node again. Nodes must be importable
+        functions. See `graffiti.artifact`
+        """
+
+        from graffiti.artifact import dump
+        self._check_compiled()
+        with open(filename, "wb") as f:
+            dump(self._compiled, f)
+
+    @classmethod
+    def load(cls, filename, executor=None, hooks=None, codegen=False,
+             flatten=False):
+        """Restore a graph written by `save`. If any node's function changed
+        since, the graph is compiled from scratch instead
+        """
+
+        from graffiti.artifact import load
+        with open(filename, "rb") as f:
+            compiled = load(f, executor=executor, hooks=hooks,
+                            codegen=codegen, flatten=flatten)
+        graph = cls(dict(compiled._schema["graph"]), executor, hooks, codegen,
+                    flatten)
+        graph._compiled = compiled
+        return graph
+
     def __str__(self):
         self._check_compiled()
-        return pformat(self._compiled._schema)
+        return pformat(dict(self._compiled._schema))
+
+    def analyze(self, timings):
+        """Critical path and parallelism of this graph given the time taken by
+        each node, eg from a `Collector`. See `graffiti.analyze.analyze`
+        """
 
-    def visualize(self, filename="graph.png", include_args=True, transitive=False):
-        """Make it pretty"""
+        self._check_compiled()
+        return analyze(self._compiled._schema, timings)
+
+    def visualize(self, filename="graph.png", include_args=True, transitive=False,
+                  timings=None):
+        """Make it pretty. With `timings`, nodes are labelled with their times
+        and the critical path is highlighted
+        """
 
         from graffiti.visualize import visualize
         self._check_compiled()
-        visualize(self._compiled._schema, filename, include_args, transitive)
+        report = self.analyze(timings) if timings is not None else None
+        visualize(self._compiled._schema, filename, include_args, transitive,
+                  report)
 
     @property
     def required(self):
@@ -0,0 +1,151 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import inspect
+from functools import partial
+
+from graffiti import core
+from graffiti import util
+from graffiti.hooks import hook_after, hook_before, hook_error
+
+__author__ = "Michael-Keith Bernard"
+
+def acall(graph, _env=None, _keys=None, _prune_keys=False, _executor=None,
+          _hooks=None, **kwargs):
+    """Evaluate `graph` on the current event loop (Python 3.5+). Returns a
+    future resolving to the same result as `graph(_env, _keys, **kwargs)`.
+
+    Nodes are started as soon as their dependencies resolve. Nodes returning an
+    awaitable (eg `async def` nodes) are scheduled on the loop so they run
+    concurrently. Sync nodes run inline, or in `_executor` if one is given.
+    Each node is reported to the graph's hooks and `_hooks`, timed from its
+    start to its resolution
+    """
+
+    loop = asyncio.get_event_loop()
+    schema = graph._schema
+    result = loop.create_future()
+    env = util.merge(_env or {}, kwargs)
+    hooks = core.graph_hooks(graph, _hooks)
+
+    try:
+        strategy, narrowed = core.narrowed_plan(schema, env, _keys)
+    except Exception as e:
+        result.set_exception(e)
+        return result
+
+    nodes = schema["schema"]
+    if narrowed:
+        # Partial results of nested graphs mustn't be cached, as in core
+        nodes = util.merge(nodes, {
+            k: util.select_keys(lambda f, _: f != "cache", nodes[k])
+            for k in narrowed })
+    waiting, dependents = core.ready_queue(
+        strategy, schema["direct_dependencies"])
+    ready = [k for k in strategy if not waiting[k]]
+    running, started = set(), {}
+    state = { "remaining": len(strategy), "draining": False }
+
+    def _fail(e):
+        if not result.done():
+            result.set_exception(e)
+        for fut in running:
+            fut.cancel()
+
+    def _error(key, e):
+        if key in started:
+            hook_error(hooks, key, started.pop(key), e)
+        _fail(e)
+
+    def _complete(key, res):
+        if key in started:
+            hook_after(hooks, key, started.pop(key), res)
+        env[key] = res
+        state["remaining"] -= 1
+        for k in dependents.get(key, []):
+            waiting[k] -= 1
+            if not waiting[k]:
+                ready.append(k)
+
+    def _done(key, cache_key, fut):
+        running.discard(fut)
+        if result.done():
+            return
+        try:
+            res = fut.result()
+        except Exception as e:
+            return _error(key, e)
+        if inspect.isawaitable(res):
+            return _await(key, cache_key, res)
+        core.cache_store(nodes[key], cache_key, res)
+        _complete(key, res)
+        _drain()
+
+    def _await(key, cache_key, awaitable):
+        fut = asyncio.ensure_future(awaitable, loop=loop)
+        running.add(fut)
+        fut.add_done_callback(partial(_done, key, cache_key))
+
+    def _start(key):
+        node = nodes[key]
+        fn, argmap = node["fn"], core.select_args(node, env)
+        if hooks is not None:
+            started[key] = hook_before(hooks, key, argmap)
+        cache_key, res = core.cache_lookup(node, argmap)
+        if res is not core.MISSING:
+            return _complete(key, res)
+
+        if hasattr(fn, "_schema"):
+            return _await(key, cache_key, acall(
+                fn, _env=argmap, _keys=narrowed.get(key), _prune_keys=True,
+                _executor=_executor,
+                _hooks=hooks.scoped(key) if hooks is not None else None))
+        if _executor is not None and not asyncio.iscoroutinefunction(fn):
+            return _await(key, cache_key, loop.run_in_executor(
+                _executor, partial(fn, **argmap)))
+
+        res = fn(**argmap)
+        if inspect.isawaitable(res):
+            return _await(key, cache_key, res)
+        core.cache_store(node, cache_key, res)
+        _complete(key, res)
+
+    def _drain():
+        if state["draining"]:
+            return
+        state["draining"] = True
+        try:
+            while ready and not result.done():
+                key = ready.pop()
+                try:
+                    _start(key)
+                except Exception as e:
+                    _error(key, e)
+        finally:
+            state["draining"] = False
+
+        if not state["remaining"] and not result.done():
+            res = env
+            if _prune_keys:
+                res = util.select_keys(lambda k, _: k in schema["nodes"], env)
+            result.set_result(res)
+
+    _drain()
+    return result
@@ -0,0 +1,103 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from graffiti import util
+
+__author__ = "Michael-Keith Bernard"
+
+def duration(timing):
+    """Seconds taken by a node, from either a plain number or an entry of
+    `graffiti.hooks.Collector.stats`
+    """
+
+    if util.is_dict(timing):
+        return timing["mean"]
+    return timing
+
+def scoped(timings, prefix):
+    """The entries of `timings` under the nested graph `prefix`"""
+
+    start = "{}.".format(prefix)
+    return { k[len(start):]: v for k, v in timings.items()
+             if str(k).startswith(start) }
+
+def analyze(schema, timings):
+    """Analyze the compiled `schema` given `timings`, a dict of node paths (eg
+    "order.sorted" for nested graphs) to seconds or to `Collector` stats.
+    Missing nodes take no time, except nested graphs which take as long as
+    their own critical path. Returns a dict of:
+
+        critical_path: the slowest chain of dependent nodes, in order
+        makespan: seconds taken by the critical path, the shortest possible
+            evaluation time given unlimited parallelism
+        work: seconds taken by all nodes, ie serial evaluation time
+        parallelism: work / makespan, the most workers that can be kept busy
+            on average
+        levels: the number of nodes at each depth (longest chain of
+            dependencies) of the graph, ie the useful width at each level
+        times: the seconds taken by each node
+        subgraphs: the same analysis for each nested graph
+    """
+
+    deps, nodes = schema["direct_dependencies"], schema["schema"]
+    subgraphs, times = {}, {}
+    for k in schema["ordering"]:
+        fn = nodes[k]["fn"]
+        if hasattr(fn, "_schema"):
+            subgraphs[k] = analyze(fn._schema, scoped(timings, k))
+        if k in timings:
+            times[k] = duration(timings[k])
+        elif k in subgraphs:
+            times[k] = subgraphs[k]["makespan"]
+        else:
+            times[k] = 0.0
+
+    finish, depth, via = {}, {}, {}
+    for k in schema["ordering"]:
+        preds = [d for d in deps[k] if d in nodes]
+        slowest = max(preds, key=finish.get) if preds else None
+        via[k] = slowest
+        finish[k] = times[k] + (finish[slowest] if preds else 0.0)
+        depth[k] = 1 + max([depth[d] for d in preds] or [-1])
+
+    critical_path = []
+    ordering = schema["ordering"][::-1]
+    last = max(ordering, key=finish.get) if ordering else None
+    while last is not None:
+        critical_path.append(last)
+        last = via[last]
+    critical_path.reverse()
+
+    levels = [0] * (1 + max(depth.values() or [-1]))
+    for d in depth.values():
+        levels[d] += 1
+
+    makespan = finish[critical_path[-1]] if critical_path else 0.0
+    work = sum(times.values())
+
+    return {
+        "critical_path": critical_path,
+        "makespan": makespan,
+        "work": work,
+        "parallelism": work / makespan if makespan else 1.0,
+        "levels": levels,
+        "times": times,
+        "subgraphs": subgraphs,
+    }
@@ -0,0 +1,191 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hashlib
+import importlib
+import marshal
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from graffiti import core
+from graffiti.cache import Cached
+
+__author__ = "Michael-Keith Bernard"
+
+VERSION = 1
+
+def qualified_name(fn):
+    """The importable `module:name` of the function `fn`"""
+
+    name = getattr(fn, "__qualname__", None) or getattr(fn, "__name__", None)
+    module = getattr(fn, "__module__", None)
+    if name is None or module is None:
+        return None
+    return "{}:{}".format(module, name)
+
+def resolve(name):
+    """Import the object named `module:name`"""
+
+    module, _, attrs = name.partition(":")
+    obj = sys.modules.get(module) or importlib.import_module(module)
+    for attr in attrs.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+def fingerprint(fn):
+    """Digest of the code of the function `fn`"""
+
+    return hashlib.sha1(marshal.dumps(fn.__code__)).digest()
+
+def unwrapped(node):
+    """The function called by the node `node`"""
+
+    return node.fn if isinstance(node, Cached) else node
+
+def defaults(info):
+    """The default values of the optional arguments in `info`, in order"""
+
+    return tuple(info["optional"][a] for a in info["args"]
+                 if a in info["optional"])
+
+def export_node(key, node, info):
+    if hasattr(node, "_schema"):
+        return {
+            "graph": export(node._schema),
+            "args": list(info["args"]),
+            "optional": info["optional"],
+        }
+    if not callable(node):
+        return { "value": node }
+
+    name = qualified_name(node)
+    try:
+        found = name is not None and resolve(name) is node
+    except (ImportError, AttributeError):
+        found = False
+    if not found or not hasattr(unwrapped(node), "__code__"):
+        raise ValueError("Node {!r} can't be exported: {} is not an importable "
+                         "function".format(key, name or repr(node)))
+
+    return {
+        "name": name,
+        "fingerprint": fingerprint(unwrapped(node)),
+        "args": list(info["args"]),
+        "optional": info["optional"],
+    }
+
+def export(schema):
+    """The serializable artifact of the compiled graph `schema`: its ordering,
+    dependency index and argument metadata, with functions replaced by their
+    qualified names and fingerprints
+    """
+
+    return {
+        "version": VERSION,
+        "nodes": { k: export_node(k, v, schema["schema"][k])
+                   for k, v in schema["graph"].items() },
+        "direct_dependencies": schema["direct_dependencies"],
+        "index": schema["index"],
+    }
+
+def restore_node(entry, plan_cache_size, codegen, path):
+    """Rebuild the `(node, info)` pair of an exported node at `path`. `info` is
+    None if the node's function changed since it was exported
+    """
+
+    if "graph" in entry:
+        node = restore(entry["graph"], plan_cache_size=plan_cache_size,
+                       codegen=codegen, path=path)
+        info = node._schema
+        if info["args"] != set(entry["args"]) or \
+                info["optional"] != entry["optional"]:
+            return node, None
+        return node, info
+    if "value" in entry:
+        return entry["value"], core.schema(entry["value"])
+
+    node = resolve(entry["name"])
+    fn = unwrapped(node)
+    args, optional = entry["args"], entry["optional"]
+    info = {
+        "fn": fn,
+        "args": args,
+        "required": { a for a in args if a not in optional },
+        "optional": optional,
+    }
+    if fingerprint(fn) != entry["fingerprint"] or \
+            (fn.__defaults__ or ()) != defaults(info):
+        return node, None
+    return node, core.annotate(node, info)
+
+def restore(artifact, executor=None, plan_cache_size=128, hooks=None,
+            codegen=False, flatten=False, path=()):
+    """Compiled graph from an `artifact` (see `export`), reattaching its
+    functions by name without analysing them again. If any function changed
+    since the artifact was made, the graph is compiled from scratch instead
+    """
+
+    if artifact.get("version") != VERSION:
+        raise ValueError("Unsupported graph artifact version: {}".format(
+            artifact.get("version")))
+
+    canonical, schematized = {}, {}
+    for k, entry in artifact["nodes"].items():
+        canonical[k], schematized[k] = restore_node(entry, plan_cache_size,
+                                                    codegen, path + (k,))
+
+    if any(v is None for v in schematized.values()):
+        return core.compile_graph(canonical, executor, plan_cache_size, hooks,
+                                  codegen, flatten, path)
+
+    core.bind_caches(canonical, schematized, path)
+    values, thunks = core.link(schematized, plan_cache_size, codegen,
+                               artifact["direct_dependencies"],
+                               artifact["index"])
+    return core.assemble(canonical, values, thunks, executor, plan_cache_size,
+                         hooks, codegen, flatten, path)
+
+def dumps(graph):
+    """Serialize the compiled graph (or `Graph`) `graph`"""
+
+    return pickle.dumps(export(graph._schema), 2)
+
+def dump(graph, f):
+    """Serialize the compiled graph (or `Graph`) `graph` to the file `f`"""
+
+    f.write(dumps(graph))
+
+def loads(data, **options):
+    """Compiled graph from `dumps` output. `options` are passed to
+    `restore`
+    """
+
+    return restore(pickle.loads(data), **options)
+
+def load(f, **options):
+    """Compiled graph from a file written by `dump`. `options` are passed to
+    `restore`
+    """
+
+    return loads(f.read(), **options)
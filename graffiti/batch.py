@@ -0,0 +1,126 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from graffiti import core
+from graffiti import util
+from graffiti.hooks import hook_after, hook_before, hook_error
+
+__author__ = "Michael-Keith Bernard"
+
+def batched(fn=None, numpy=False):
+    """Node decorator declaring that the node evaluates a whole batch at once.
+    Instead of scalars it receives one column (list) per argument and must
+    return a sequence with one result per record. With `numpy=True` columns
+    are NumPy arrays, if NumPy is installed
+
+    @batched
+    def total(xs):
+        return [sum(x) for x in xs]
+    """
+
+    def _decorator(fn):
+        fn._batch = "numpy" if numpy else "list"
+        return fn
+    return _decorator if fn is None else _decorator(fn)
+
+def column(values, kind):
+    """Build an argument column for a batch node"""
+
+    if kind == "numpy":
+        try:
+            import numpy
+        except ImportError:
+            return values
+        return numpy.asarray(values)
+    return values
+
+def unbatched(fn):
+    """Adapt the batch node `fn` to be called with a single record's values"""
+
+    def _unbatched(**argmap):
+        columns = { k: column([v], fn._batch) for k, v in argmap.items() }
+        return fn(**columns)[0]
+    return _unbatched
+
+def map_graph(graph, inputs, _keys=None, _prune_keys=False, _hooks=None):
+    """Evaluate `graph` over every input dict in `inputs`, returning one
+    result per input (as `[graph(e, _keys) for e in inputs]` would). Records
+    that provide the same keys share one plan, and each node is evaluated once
+    per group: batch nodes receive columns, other nodes are looped per record.
+    Calls are reported to the graph's hooks and `_hooks`, a batch node or
+    nested graph once per group
+    """
+
+    schema = graph._schema
+    nodes = schema["schema"]
+    known = schema["nodes"] | schema["args"]
+    envs = [util.merge(e) for e in inputs]
+    hooks = core.graph_hooks(graph, _hooks)
+
+    shape = lambda i: frozenset(k for k in envs[i] if k in known)
+    for idxs in util.group_by(shape, range(len(envs))).values():
+        group = [envs[i] for i in idxs]
+        strategy, narrowed = core.narrowed_plan(schema, group[0], _keys)
+        for key in strategy:
+            results = _map_node(nodes[key], group, narrowed.get(key), key,
+                                hooks)
+            for env, res in zip(group, results):
+                env[key] = res
+
+    if _prune_keys:
+        envs = [util.select_keys(lambda k, _: k in schema["nodes"], e)
+                for e in envs]
+    return envs
+
+def _map_node(node, group, keys=None, key=None, hooks=None):
+    fn = node["fn"]
+    argmaps = [core.select_args(node, env) for env in group]
+
+    if "batch" not in node and not hasattr(fn, "_schema"):
+        if hooks is None:
+            return [core.call_node(node, argmap) for argmap in argmaps]
+        return [core.call_hooked(node, argmap, key, hooks)
+                for argmap in argmaps]
+
+    if hooks is None:
+        return _map_group(node, argmaps, keys)
+    columns = { k: [argmap[k] for argmap in argmaps] for k in argmaps[0] }
+    started = hook_before(hooks, key, columns)
+    try:
+        results = _map_group(node, argmaps, keys, hooks.scoped(key))
+    except Exception as e:
+        hook_error(hooks, key, started, e)
+        raise
+    hook_after(hooks, key, started, results)
+    return results
+
+def _map_group(node, argmaps, keys=None, hooks=None):
+    fn = node["fn"]
+    if hasattr(fn, "_schema"):
+        return map_graph(fn, argmaps, keys, _prune_keys=True, _hooks=hooks)
+
+    batch = node["batch"]
+    columns = { k: column([argmap[k] for argmap in argmaps], batch._batch)
+                for k in argmaps[0] }
+    results = batch(**columns)
+    if len(results) != len(argmaps):
+        raise ValueError("Batch node returned {} results for {} records".format(
+            len(results), len(argmaps)))
+    return results
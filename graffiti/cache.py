@@ -0,0 +1,447 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import errno
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import partial, update_wrapper
+from types import ModuleType
+
+__author__ = "Michael-Keith Bernard"
+
+_missing = object()
+
+class LRUCache(object):
+    """A thread-safe, size-bounded mapping that evicts the least recently used
+    entry (unbounded if `maxsize` is None). Lookups through `get` are counted
+    in `stats`
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+class TTLCache(LRUCache):
+    """Like `LRUCache`, but entries also expire `ttl` seconds after being set"""
+
+    def __init__(self, ttl, maxsize=128, timer=time.time):
+        super(TTLCache, self).__init__(maxsize)
+        self.ttl = ttl
+        self.timer = timer
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires <= self.timer():
+                self.misses += 1
+                self.evictions += 1
+                return default
+            self._data[key] = (expires, value)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        entry = (self.timer() + self.ttl, value)
+        super(TTLCache, self).__setitem__(key, entry)
+
+class TieredCache(object):
+    """Chain of caches, fastest first (eg an `LRUCache` in front of a
+    `DirectoryStore`). Hits in a slower tier are copied into the faster ones,
+    and new results are written to every tier
+    """
+
+    def __init__(self, *caches):
+        self.caches = caches
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        for i, c in enumerate(self.caches):
+            value = c.get(key, _missing)
+            if value is not _missing:
+                for faster in self.caches[:i]:
+                    faster[key] = value
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, value):
+        for c in self.caches:
+            c[key] = value
+
+    def bind(self, name, fingerprint=None):
+        return TieredCache(*[bind(c, name, fingerprint) for c in self.caches])
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": sum(c.stats["evictions"] for c in self.caches),
+            "tiers": [c.stats for c in self.caches],
+        }
+
+class DirectoryStore(object):
+    """Persistent, content-addressed store of pickled node results under
+    `root`, with one sub-directory per node. Safe to share between processes:
+    entries are written to a temporary file and renamed into place. If
+    `max_bytes` is set, the least recently used entries are removed once the
+    store grows past it
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._since_prune = 0
+        self.evictions = 0
+        _makedirs(root)
+
+    def bind(self, name, fingerprint=None):
+        """The store for the node called `name`, whose function has the
+        `fingerprint` (see `graffiti.cache.fingerprint`). Raises ValueError if
+        the fingerprint has no digest, as results of a different function
+        could then be served
+        """
+
+        if fingerprint is not None and fingerprint[1] is None:
+            raise ValueError("Can't persist the results of {}: its closure, "
+                             "defaults or arguments can't be pickled".format(
+                                 name))
+        return NodeStore(self, name, fingerprint)
+
+    def path(self, name):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(name))[:64]
+        return os.path.join(self.root, "{}-{}".format(safe, _digest(name)[:8]))
+
+    def invalidate(self, name):
+        """Remove every stored result of the node called `name`"""
+
+        shutil.rmtree(self.path(name), ignore_errors=True)
+
+    def clear(self):
+        for entry in os.listdir(self.root):
+            shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+    def entries(self):
+        """Yield `(path, size, mtime)` for each stored result"""
+
+        for dirpath, _, files in os.walk(self.root):
+            for f in files:
+                path = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self):
+        """Remove least recently used entries until under `max_bytes`"""
+
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+            self.evictions += 1
+        self._since_prune = 0
+
+    def _written(self, size):
+        if self.max_bytes is None:
+            return
+        self._since_prune += size
+        if self._since_prune > self.max_bytes // 10:
+            self.prune()
+
+class NodeStore(object):
+    """The results of a single node in a `DirectoryStore`. Results are keyed by
+    the node function's `fingerprint` as well as the arguments, so results of
+    an older version of the function are never served
+    """
+
+    def __init__(self, store, name, fingerprint=None):
+        self.store = store
+        self.name = name
+        self.fingerprint = fingerprint
+        self.directory = store.path(name)
+        self.hits = self.misses = 0
+
+    def _file(self, key):
+        if self.fingerprint is not None:
+            key = (self.fingerprint, key)
+        return os.path.join(self.directory, _digest(key) + ".pkl")
+
+    def get(self, key, default=None):
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        _makedirs(self.directory)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp)
+            os.rename(tmp, self._file(key))
+        except Exception:
+            _remove(tmp)
+            raise
+        self.store._written(size)
+
+    def clear(self):
+        self.store.invalidate(self.name)
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.store.evictions,
+        }
+
+class Namespaced(object):
+    """View of a cache that may be shared between nodes, keeping the entries
+    of the node called `name` apart from the others. Hits and misses are
+    counted per view, size and evictions are those of the shared cache
+    """
+
+    def __init__(self, cache, name, fingerprint=None):
+        self.cache = cache
+        self.name = name
+        self.fingerprint = fingerprint
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.cache.get((self.name, self.fingerprint, key), _missing)
+        if value is _missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self.cache[(self.name, self.fingerprint, key)] = value
+
+    def __contains__(self, key):
+        return (self.name, self.fingerprint, key) in self.cache
+
+    @property
+    def stats(self):
+        return dict(self.cache.stats, hits=self.hits, misses=self.misses)
+
+def bind(cache, name, fingerprint=None):
+    """Bind `cache` to the node called `name` (its full path from the root
+    graph), whose function has the `fingerprint`. Caches that know how to
+    share themselves between nodes (eg `DirectoryStore`) bind themselves,
+    others are namespaced
+    """
+
+    if hasattr(cache, "bind"):
+        return cache.bind(name, fingerprint)
+    return Namespaced(cache, name, fingerprint)
+
+def fingerprint(fn):
+    """Identity of the node function `fn` for cache keys: its qualified name
+    and a digest of its code, default values and closure (of its function and
+    arguments, for a `functools.partial`). Moving a function around its module
+    keeps its fingerprint, changing any of these doesn't. The digest is None
+    if some of them can't be pickled
+    """
+
+    if isinstance(fn, Cached):
+        fn = fn.fn
+    target = fn.func if isinstance(fn, partial) else fn
+    name = getattr(target, "__qualname__", None) or \
+        getattr(target, "__name__", type(target).__name__)
+    try:
+        digest = _function_digest(fn, set())
+    except Exception:
+        # Unpicklable state, or an empty closure cell
+        digest = None
+    return "{}:{}".format(getattr(target, "__module__", None), name), digest
+
+def _function_digest(fn, seen):
+    if id(fn) in seen:
+        return "recursive"
+    seen.add(id(fn))
+
+    if isinstance(fn, partial):
+        parts = [_function_digest(fn.func, seen)]
+        parts += [_value_digest(v, seen) for v in fn.args]
+        keywords = sorted((fn.keywords or {}).items())
+    elif hasattr(fn, "__func__"):
+        parts = [_function_digest(fn.__func__, seen),
+                 _value_digest(fn.__self__, seen)]
+        keywords = []
+    elif getattr(fn, "__code__", None) is not None:
+        parts = [_code_digest(fn.__code__)]
+        parts += [_value_digest(v, seen) for v in fn.__defaults__ or ()]
+        parts += [_value_digest(c.cell_contents, seen)
+                  for c in fn.__closure__ or ()]
+        keywords = sorted((getattr(fn, "__kwdefaults__", None) or {}).items())
+    else:
+        return _digest(fn)[:16]
+
+    parts += ["{}={}".format(k, _value_digest(v, seen)) for k, v in keywords]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def _value_digest(value, seen):
+    if isinstance(value, ModuleType):
+        return "module:" + value.__name__
+    if isinstance(value, partial) or \
+            getattr(value, "__code__", None) is not None:
+        return _function_digest(value, seen)
+    return _digest(value)[:16]
+
+def _code_digest(code):
+    h = hashlib.sha1(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            h.update(_code_digest(const).encode("ascii"))
+        elif isinstance(const, frozenset):
+            h.update(repr(sorted(const, key=repr)).encode("utf-8"))
+        else:
+            h.update(repr(const).encode("utf-8"))
+    h.update(repr((code.co_names, code.co_varnames)).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _digest(value):
+    return hashlib.sha1(pickle.dumps(value, 2)).hexdigest()
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def argument_key(argmap):
+    """Cache key for a node's bound arguments. Hashable arguments are used
+    directly, otherwise they are hashed by their pickled representation
+    """
+
+    items = tuple(sorted(argmap.items()))
+    try:
+        hash(items)
+        return items
+    except TypeError:
+        return _digest(items)
+
+class Cached(object):
+    """The node function `fn` with the result cache `cache`. Calls go straight
+    to `fn`; the cache is only used when evaluated as part of a graph
+    """
+
+    def __init__(self, fn, cache):
+        self.fn = fn
+        self.cache = cache
+        try:
+            update_wrapper(self, fn)
+        except AttributeError:
+            pass
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+def cached(cache):
+    """Node decorator declaring `cache` (eg an `LRUCache` or `TTLCache`) as the
+    result cache of the node, keyed by its arguments. `fn` itself is left
+    untouched
+
+    @cached(LRUCache(1000))
+    def expensive(xs):
+        ...
+    """
+
+    def _decorator(fn):
+        return Cached(fn, cache)
+    return _decorator
@@ -0,0 +1,135 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Generate a straight-line Python function for each execution plan, so that
+evaluating a graph costs little more than calling its nodes.
+
+For a plan computing `n` and `m` from the input `xs` the generated code is:
+
+    def _evaluate(env):
+        v0 = env['xs']
+        env['n'] = v1 = f0(xs=v0)
+        env['m'] = v2 = f1(xs=v0, n=v1)
+        return env
+
+Plain function nodes are called directly. Cached, batched and nested graph
+nodes go through `graffiti.core.call_node` as usual.
+"""
+
+import keyword
+import re
+
+from graffiti import core
+from graffiti import util
+
+__author__ = "Michael-Keith Bernard"
+
+def literal(key, consts):
+    """Source for `key`, as a literal if possible or else an index into
+    `consts`
+    """
+
+    if isinstance(key, str):
+        return repr(key)
+    consts.append(key)
+    return "K[{}]".format(len(consts) - 1)
+
+def identifier(name):
+    """Returns true if `name` can be passed as a keyword argument in source"""
+
+    return isinstance(name, str) and not keyword.iskeyword(name) and \
+        re.match(r"[A-Za-z_][A-Za-z0-9_]*$", name) is not None
+
+def generate(schema, strategy, given):
+    """Generate a function evaluating `strategy`, a plan of the compiled
+    `schema` for an env providing the names in the `given` mask. The function
+    takes the env and returns it updated with each result, like
+    `graffiti.core.evaluate`
+    """
+
+    index, nodes = schema["index"], schema["schema"]
+    names, consts, lines = {}, [], []
+    namespace = { "K": consts, "call_node": core.call_node }
+
+    def _local(key):
+        if key not in names:
+            names[key] = "v{}".format(len(names))
+            lines.append("    {} = env[{}]".format(
+                names[key], literal(key, consts)))
+        return names[key]
+
+    computed = set()
+    for i, key in enumerate(strategy):
+        node = nodes[key]
+        params = node.get("params")
+        param = dict(params).get if params else util.identity
+        static, dynamic = [], []
+        for arg in node["args"]:
+            if arg in computed or index.mask([arg]) & given:
+                static.append(arg)
+            elif arg not in index.ids:
+                dynamic.append(arg)
+            # otherwise it's an optional node that isn't available yet
+
+        argmap = [(param(a), _local(a)) for a in static]
+        var = names[key] = "v{}".format(len(names))
+        target = "env[{}] = {}".format(literal(key, consts), var)
+
+        plain = "cache" not in node and "batch" not in node and \
+            not hasattr(node["fn"], "_schema")
+        if plain and not dynamic and all(identifier(a) for a, _ in argmap):
+            namespace["f{}".format(i)] = node["fn"]
+            lines.append("    {} = f{}({})".format(target, i, ", ".join(
+                "{}={}".format(a, v) for a, v in argmap)))
+            computed.add(key)
+            continue
+
+        lines.append("    a = {{{}}}".format(", ".join(
+            "{!r}: {}".format(a, v) for a, v in argmap)))
+        for a in dynamic:
+            lines.append("    if {0!r} in env: a[{1!r}] = env[{0!r}]".format(
+                a, param(a)))
+        if plain:
+            namespace["f{}".format(i)] = node["fn"]
+            lines.append("    {} = f{}(**a)".format(target, i))
+        else:
+            namespace["n{}".format(i)] = node
+            lines.append("    {} = call_node(n{}, a)".format(target, i))
+        computed.add(key)
+
+    source = "\n".join(["def _evaluate(env):"] + lines + ["    return env"])
+    exec(compile(source, "<graffiti plan>", "exec"), namespace)
+    fn = namespace["_evaluate"]
+    fn.source = source
+    return fn
+
+def generated(schema, env, keys=None):
+    """The generated function for the plan of `keys` given `env`, memoized in
+    `schema["generated"]` the same way plans are
+    """
+
+    index, funcs = schema["index"], schema["generated"]
+    given = index.mask(env)
+    cache_key = (None if keys is None else frozenset(keys), given)
+    fn = funcs.get(cache_key)
+    if fn is None:
+        strategy = core.plan(schema, env, keys)
+        fn = funcs[cache_key] = generate(schema, strategy, given)
+    return fn
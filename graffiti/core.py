@@ -19,37 +19,117 @@
 # IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import pickle
+import warnings
+
 from graffiti import util
+from graffiti.cache import Cached, LRUCache, argument_key, bind, fingerprint
+from graffiti.hooks import combine, hook_after, hook_before, hook_error
+from graffiti.index import DependencyIndex
 
 __author__ = "Michael-Keith Bernard"
 
+MISSING = object()
+
 def schema(v):
     if hasattr(v, "_schema"):
         return v._schema
-    return util.fninfo(v if callable(v) else lambda: v)
+    fn = v.fn if isinstance(v, Cached) else v
+    return annotate(v, util.fninfo(fn if callable(fn) else lambda: fn))
+
+def annotate(v, info):
+    """Add the cache and batch settings declared on the node `v` to its
+    argument `info`
+    """
+
+    if isinstance(v, Cached):
+        info["cache"], v = v.cache, v.fn
+    if getattr(v, "_batch", None) is not None:
+        from graffiti.batch import unbatched
+        info["batch"], info["fn"] = v, unbatched(v)
+    return info
 
 def dependencies(g):
     deps = {}
-    for k, v in g.iteritems():
+    for k, v in g.items():
         deps[k] = set(v["required"])
     return deps
 
-def transitive(deps):
-    def deps_for(k):
-        if k not in deps:
-            return [k]
-        trans = set(util.concat1(deps_for(e) for e in deps[k]))
-        return trans | set(deps[k])
-    return { k: deps_for(k) for k in deps }
+def consumers(g):
+    """Map each key to the set of nodes in the schematized graph `g` that take
+    it as an argument (required or optional)
+    """
+
+    acc = {}
+    for k, v in g.items():
+        for arg in v["args"]:
+            acc.setdefault(arg, set()).add(k)
+    return acc
+
+def transitive(deps, order=None):
+    """Find the transitive dependencies of every key in `deps`. Keys are
+    visited dependencies-first (`order`, computed if not given) so each
+    closure is built from the closures of its direct dependencies
+    """
+
+    if order is None:
+        order = topological(deps)[::-1]
+
+    closure = {}
+    for k in order:
+        trans = set(deps[k])
+        for d in deps[k]:
+            if d in closure:
+                trans |= closure[d]
+        closure[k] = trans
+    return closure
 
 def topological(deps):
-    if not deps:
-        return []
-    sources = list(set(deps) - set(util.concat1(deps.values())))
-    if not sources:
-        raise ValueError("Graph cycle detected!")
-    return (sources +
-        topological(util.select_keys(lambda k, _: k not in sources, deps)))
+    """Order the keys of `deps` so that every key comes before its
+    dependencies (Kahn's algorithm). Raises ValueError naming the nodes of a
+    cycle if no such order exists
+    """
+
+    dependents = dict.fromkeys(deps, 0)
+    for k, v in deps.items():
+        for d in v:
+            if d in dependents:
+                dependents[d] += 1
+
+    order = [k for k, n in dependents.items() if not n]
+    for k in order:
+        for d in deps[k]:
+            if d in dependents:
+                dependents[d] -= 1
+                if not dependents[d]:
+                    order.append(d)
+
+    if len(order) < len(deps):
+        cycle = find_cycle(deps, set(deps) - set(order))
+        raise ValueError("Graph cycle detected: {}".format(" -> ".join(cycle)))
+    return order
+
+def find_cycle(deps, remaining):
+    """Find a cycle among `remaining`, the keys Kahn's algorithm could not
+    order. Each of them still has a dependent in `remaining`, so following
+    dependents must eventually revisit a key
+    """
+
+    dependents = {}
+    for k in remaining:
+        for d in deps[k]:
+            if d in remaining:
+                dependents.setdefault(d, []).append(k)
+
+    path, seen = [], {}
+    k = next(iter(remaining))
+    while k not in seen:
+        seen[k] = len(path)
+        path.append(k)
+        k = dependents[k][0]
+
+    cycle = path[seen[k]:][::-1]
+    return [str(e) for e in cycle + cycle[:1]]
 
 def required_keys(requested, given, deps):
     required = set(requested)
@@ -59,68 +139,670 @@ def required_keys(requested, given, deps):
         required |= trans - prune
     return required
 
+def split_key(key, nodes):
+    """Split a requested key into the pair `(node, path)`, where `path` is the
+    key asked of the nested graph `node` (eg for the keys ("order", "sorted")
+    or "order.sorted"), or None if the whole node was requested
+    """
+
+    if key in nodes:
+        return key, None
+    if isinstance(key, tuple):
+        if len(key) == 1:
+            return key[0], None
+        return key[0], key[1] if len(key) == 2 else key[1:]
+    if isinstance(key, str) and "." in key:
+        return tuple(key.split(".", 1))
+    return key, None
+
+def narrow(nodes, keys):
+    """Split the requested `keys` of the schematized `nodes` into the set of
+    node names to evaluate and a dict of the keys asked of each nested graph
+    that isn't requested whole
+    """
+
+    names, paths = set(), {}
+    for key in keys:
+        name, path = split_key(key, nodes)
+        names.add(name)
+        if path is not None:
+            if name in nodes and not hasattr(nodes[name]["fn"], "_schema"):
+                raise ValueError("Not a nested graph: {}".format(name))
+            paths.setdefault(name, set()).add(path)
+    return names, { k: v for k, v in paths.items() if k not in keys }
+
+def narrowed_dependencies(schema, paths):
+    """Direct dependency masks of the nested graph nodes in `paths` (see
+    `narrow`), limited to the inputs needed for the keys asked of them
+    """
+
+    index, nodes = schema["index"], schema["schema"]
+    return { index.ids[k]: index.mask(requirements(nodes[k]["fn"]._schema, sub))
+             for k, sub in paths.items() }
+
+def known(index, names):
+    """Raise KeyError unless all `names` are nodes or inputs in `index`"""
+
+    unknown = [k for k in names if k not in index.ids]
+    if unknown:
+        raise KeyError("Unknown graph keys: {}".format(", ".join(
+            sorted(str(k) for k in unknown))))
+
+def narrowing(schema, keys, given=0):
+    """Narrow the requested `keys` of the compiled `schema` (see `narrow`).
+    Returns the node names, the keys asked of each nested graph and the mask
+    of the keys needed to produce them given the `given` mask. A nested graph
+    taken whole by another node that must be evaluated isn't narrowed
+    """
+
+    index, consumers = schema["index"], schema["consumers"]
+    names, paths = narrow(schema["schema"], keys)
+    known(index, names)
+    while True:
+        direct = narrowed_dependencies(schema, paths) if paths else None
+        needed = index.required_keys(names, given, direct)
+        whole = { k for k in paths
+                  if index.mask(consumers.get(k, ())) & needed & ~given }
+        if not whole:
+            return names, paths, needed
+        paths = { k: v for k, v in paths.items() if k not in whole }
+
+def requirements(schema, keys):
+    """Names of the inputs of the compiled `schema` needed to produce `keys`"""
+
+    index = schema["index"]
+    return index.keys(narrowing(schema, keys)[2] & index.inputs)
+
+def plan(schema, env, keys=None):
+    """Find the ordered list of nodes in the compiled `schema` that must be
+    evaluated to produce `keys` (or every node, if None) given `env`. Keys may
+    be paths into nested graphs (see `split_key`). Plans are memoized in
+    `schema["plans"]` when the schema has a plan cache
+    """
+
+    return narrowed_plan(schema, env, keys)[0]
+
+def narrowed_plan(schema, env, keys=None):
+    """Like `plan`, but returns the pair `(strategy, narrowed)`, where
+    `narrowed` maps each nested graph in the plan that only needs to produce
+    some of its keys to those keys (see `narrowed_nodes`)
+    """
+
+    plans = schema.get("plans")
+    given = schema["index"].mask(env)
+    if plans is None:
+        return _plan(schema, given, keys)
+
+    cache_key = (None if keys is None else frozenset(keys), given)
+    planned = plans.get(cache_key)
+    if planned is None:
+        planned = plans[cache_key] = _plan(schema, given, keys)
+    return planned
+
+def _plan(schema, given, keys):
+    index = schema["index"]
+    if keys is None:
+        needed, paths = index.nodes | index.inputs, {}
+    else:
+        _, paths, needed = narrowing(schema, keys, given)
+
+    if needed & index.inputs & ~given:
+        raise ValueError("Unmet graph requirements: {}".format(", ".join(
+            sorted(str(k) for k in index.keys(needed & index.inputs & ~given)))))
+
+    return tuple(index.strategy(needed & ~given)), paths
+
+def cache_stats(schema):
+    """Hit/miss/eviction counters of every cached node in `schema`, with
+    nested graphs reported under their node name
+    """
+
+    stats = {}
+    for k, v in schema["schema"].items():
+        if "cache" in v:
+            stats[k] = v["cache"].stats
+        elif hasattr(v["fn"], "_schema"):
+            nested = cache_stats(v["fn"]._schema)
+            if nested:
+                stats[k] = nested
+    return stats
+
+def warm(schema, keys=None, given=()):
+    """Pre-compute the plan for `keys` when the inputs named in `given` are
+    provided, so later calls with that shape hit the plan cache
+    """
+
+    return plan(schema, dict.fromkeys(given), keys)
+
+def select_args(node, env):
+    """Select the arguments of a schematized `node` from `env`. Nodes with
+    "params" (see `graffiti.flatten`) take the value of each env key under
+    their own argument name
+    """
+
+    params = node.get("params")
+    if params is None:
+        return { k: env[k] for k in node["args"] if k in env }
+    return { p: env[k] for k, p in params if k in env }
+
+def apply_node(fn, argmap, hooks=None):
+    """Apply a node function (or compiled sub-graph) to its arguments. `hooks`
+    are passed on to sub-graphs
+    """
+
+    if hasattr(fn, "_schema"):
+        if hooks is not None:
+            return fn(_env=argmap, _prune_keys=True, _hooks=hooks)
+        return fn(_env=argmap, _prune_keys=True)
+    return fn(**argmap)
+
+def narrowed_node(node, keys):
+    """The schematized nested graph `node`, evaluating only `keys`"""
+
+    fn = node["fn"]
+
+    def _narrowed(**kwargs):
+        return fn(_keys=keys, **kwargs)
+
+    _narrowed._schema = fn._schema
+    return {
+        "fn": _narrowed,
+        "args": node["args"],
+        "required": node["required"],
+        "optional": node["optional"],
+    }
+
+def narrowed_nodes(nodes, narrowed):
+    """`nodes` with each nested graph in `narrowed` (see `narrowed_plan`)
+    evaluating only the keys asked of it
+    """
+
+    if not narrowed:
+        return nodes
+    return util.merge(nodes, { k: narrowed_node(nodes[k], frozenset(sub))
+                               for k, sub in narrowed.items() })
+
+def cache_lookup(node, argmap):
+    """Look up `argmap` in the result cache of `node`. Returns the pair
+    `(cache key, result)`. The key is None if the node isn't cached, and the
+    result is `MISSING` unless it was found in the cache
+    """
+
+    cache = node.get("cache")
+    if cache is None:
+        return None, MISSING
+    key = argument_key(argmap)
+    return key, cache.get(key, MISSING)
+
+def cache_store(node, key, res):
+    """Store a result found missing by `cache_lookup`"""
+
+    if key is not None:
+        node["cache"][key] = res
+
+def call_node(node, argmap):
+    """Apply `node` to `argmap`, going through its result cache if it has one"""
+
+    key, res = cache_lookup(node, argmap)
+    if res is MISSING:
+        res = apply_node(node["fn"], argmap)
+        cache_store(node, key, res)
+    return res
+
+def call_hooked(node, argmap, key, hooks):
+    """`call_node`, reporting the call of `key` to `hooks`"""
+
+    started = hook_before(hooks, key, argmap)
+    try:
+        cache_key, res = cache_lookup(node, argmap)
+        if res is MISSING:
+            res = apply_node(node["fn"], argmap, hooks.scoped(key))
+            cache_store(node, cache_key, res)
+    except Exception as e:
+        hook_error(hooks, key, started, e)
+        raise
+    hook_after(hooks, key, started, res)
+    return res
+
 def call_with(schema):
     def _invoke(env, key):
-        fn, args = schema[key]["fn"], schema[key]["args"]
-        argmap = util.select_keys(lambda k, _: k in args, env)
-        if hasattr(fn, "_schema"):
-            res = fn(_env=argmap, _prune_keys=True)
-        else:
-            res = fn(**argmap)
+        res = call_node(schema[key], select_args(schema[key], env))
         return util.merge(env, { key: res })
     return _invoke
 
-def compile_graph(g):
+def evaluate(schema, strategy, env, counts=None, hooks=None):
+    """Evaluate `strategy` in order, writing each result into `env`. If
+    `counts` (see `release_counts`) is given, intermediate values are removed
+    from `env` as soon as their last consumer has run. Each call is reported
+    to `hooks` if given
+    """
+
+    for key in strategy:
+        node = schema[key]
+        if hooks is None:
+            env[key] = call_node(node, select_args(node, env))
+        else:
+            env[key] = call_hooked(node, select_args(node, env), key, hooks)
+        if counts:
+            release(node, env, counts)
+    return env
+
+def release_counts(schema, strategy, keep):
+    """Count how many nodes in `strategy` consume each intermediate value, ie
+    each node of `strategy` that isn't in `keep`
+    """
+
+    counts = dict.fromkeys(set(strategy) - set(keep), 0)
+    for key in strategy:
+        for arg in schema[key]["args"]:
+            if arg in counts:
+                counts[arg] += 1
+    return counts
+
+def release(node, env, counts):
+    """Record that `node` has consumed its arguments, removing intermediate
+    values from `env` once they have no consumers left
+    """
+
+    for arg in node["args"]:
+        if arg in counts:
+            counts[arg] -= 1
+            if not counts[arg]:
+                env.pop(arg, None)
+
+def update(schema, previous, changed, hooks=None):
+    """Apply the changed inputs in `changed` to `previous`, a result of the
+    compiled `schema`. Only nodes of `previous` that (transitively) consume a
+    changed key are recomputed, and nested graphs are updated the same way.
+    Each recomputed node is reported to `hooks` if given
+    """
+
+    env = util.merge(previous, changed)
+    nodes, uses = schema["schema"], schema["consumers"]
+
+    affected, frontier = set(), list(changed)
+    while frontier:
+        for c in uses.get(frontier.pop(), ()):
+            if c not in affected and c in previous and c not in changed:
+                affected.add(c)
+                frontier.append(c)
+
+    dirty = set(changed)
+    for key in sorted(affected, key=schema["index"].position.get):
+        node = nodes[key]
+        argmap = select_args(node, env)
+        if hasattr(node["fn"], "_schema"):
+            env[key] = update_nested(node["fn"], argmap, previous[key], dirty,
+                                     key, hooks)
+        elif hooks is None:
+            env[key] = call_node(node, argmap)
+        else:
+            env[key] = call_hooked(node, argmap, key, hooks)
+        dirty.add(key)
+
+    return env
+
+def update_nested(fn, argmap, previous, dirty, key, hooks=None):
+    """`update` the result `previous` of the nested graph `fn`, node `key`
+    of its parent, after the arguments in `dirty` changed
+    """
+
+    sub = fn._schema
+    inner = util.select_keys(lambda k, _: k in dirty, argmap)
+    if hooks is None:
+        started, scoped = None, None
+    else:
+        started, scoped = hook_before(hooks, key, argmap), hooks.scoped(key)
+    try:
+        res = update(sub, util.merge(argmap, previous), inner,
+                     graph_hooks(fn, scoped))
+    except Exception as e:
+        if hooks is not None:
+            hook_error(hooks, key, started, e)
+        raise
+    res = util.select_keys(lambda k, _: k in sub["nodes"], res)
+    if hooks is not None:
+        hook_after(hooks, key, started, res)
+    return res
+
+def ready_queue(strategy, deps):
+    """Build the scheduling state for `strategy`. Returns the tuple
+    `(waiting, dependents)` where `waiting` maps each key to the number of its
+    dependencies still to be computed, and `dependents` maps each key to the
+    keys waiting on it
+    """
+
+    pending = set(strategy)
+    waiting, dependents = {}, {}
+    for k in strategy:
+        needs = deps[k] & pending
+        waiting[k] = len(needs)
+        for d in needs:
+            dependents.setdefault(d, []).append(k)
+    return waiting, dependents
+
+def picklable(fn):
+    """Returns true if `fn` can be shipped to another process"""
+
+    if hasattr(fn, "_schema"):
+        return False
+    try:
+        pickle.dumps(fn, pickle.HIGHEST_PROTOCOL)
+        return True
+    except Exception:
+        return False
+
+def local_nodes(schema):
+    """Find the nodes in `schema` that must be evaluated in-process when using
+    a process pool: sub-graphs, lambdas and other unpicklable functions
+    """
+
+    return { k for k, v in schema.items() if not picklable(v["fn"]) }
+
+def in_process(schema, executor):
+    """Nodes of the compiled `schema` that must be evaluated in the calling
+    thread when using `executor`. Only process pools keep any nodes local.
+    The partition is computed, and warned about, once per executor type
+    """
+
+    partitions = schema["partitions"]
+    kind = type(executor)
+    if kind not in partitions:
+        partitions[kind] = partition(schema, executor)
+    return partitions[kind]
+
+def partition(schema, executor):
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not isinstance(executor, ProcessPoolExecutor):
+        return ()
+
+    local = schema["local"]
+    named = sorted(str(k) for k in local if callable(schema["graph"][k]))
+    if named:
+        warnings.warn("Not offloading unpicklable nodes to process pool: "
+                      "{}".format(", ".join(named)), RuntimeWarning)
+    return local
+
+def dispatch(node, argmap, executor, local=False, hooks=None):
+    """Start evaluating `node` on `argmap`. Returns the tuple
+    `(future, cache key, result)`, where `future` is None if the result is
+    already known (a cache hit, or a `local` node run in this thread).
+    `hooks` are passed on to sub-graphs
+    """
+
+    cache_key, res = cache_lookup(node, argmap)
+    if res is not MISSING:
+        return None, None, res
+    if local:
+        res = apply_node(node["fn"], argmap, hooks)
+        cache_store(node, cache_key, res)
+        return None, None, res
+    if hooks is not None:
+        future = executor.submit(apply_node, node["fn"], argmap, hooks)
+    else:
+        future = executor.submit(apply_node, node["fn"], argmap)
+    return future, cache_key, None
+
+def run_parallel(schema, deps, strategy, env, executor, local=(),
+                 counts=None, hooks=None):
+    """Evaluate `strategy` by submitting every node whose dependencies are
+    satisfied to `executor` (eg a `concurrent.futures.ThreadPoolExecutor`),
+    writing each result into `env`. Nodes in `local` are evaluated in the
+    calling thread instead. `counts` and `hooks` are as in `evaluate`, except
+    that hooks time each node from its submission to its completion
+    """
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    waiting, dependents = ready_queue(strategy, deps)
+    ready = [k for k in strategy if not waiting[k]]
+    running, started = {}, {}
+
+    def _complete(key, res):
+        if hooks is not None:
+            hook_after(hooks, key, started.pop(key), res)
+        env[key] = res
+        if counts:
+            release(schema[key], env, counts)
+        for k in dependents.get(key, []):
+            waiting[k] -= 1
+            if not waiting[k]:
+                ready.append(k)
+
+    while ready or running:
+        while ready:
+            key = ready.pop()
+            node = schema[key]
+            argmap = select_args(node, env)
+            if hooks is None:
+                future, cache_key, res = dispatch(node, argmap, executor,
+                                                  key in local)
+            else:
+                started[key] = hook_before(hooks, key, argmap)
+                try:
+                    future, cache_key, res = dispatch(
+                        node, argmap, executor, key in local,
+                        hooks.scoped(key))
+                except Exception as e:
+                    hook_error(hooks, key, started.pop(key), e)
+                    raise
+            if future is None:
+                _complete(key, res)
+            else:
+                running[future] = (key, cache_key)
+
+        if running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, cache_key = running.pop(future)
+                if hooks is None:
+                    res = future.result()
+                else:
+                    try:
+                        res = future.result()
+                    except Exception as e:
+                        hook_error(hooks, key, started.pop(key), e)
+                        raise
+                cache_store(schema[key], cache_key, res)
+                _complete(key, res)
+
+    return env
+
+def link(schematized, plan_cache_size=128, codegen=False, deps=None,
+         index=None):
+    """Order and index `schematized` nodes for planning and evaluation.
+    Returns the pair `(values, thunks)` of the entries of a compiled schema.
+    `deps` and `index` may be given if they are already known
+    """
+
+    if deps is None:
+        deps = dependencies(schematized)
+    if index is None:
+        index = DependencyIndex(deps, topological(deps)[::-1])
+    topo = list(index.order)
+    generate = codegen and plan_cache_size
+
+    return {
+        "direct_dependencies": deps,
+        "index": index,
+        "schema": schematized,
+        "ordering": topo,
+        "nodes": set(deps),
+        "plans": LRUCache(plan_cache_size) if plan_cache_size else None,
+        "generated": LRUCache(plan_cache_size) if generate else None,
+        "partitions": {},
+    }, {
+        "dependencies": index.dependencies,
+        "dependency_ordering": index.dependency_ordering,
+        "consumers": lambda: consumers(schematized),
+        "local": lambda: local_nodes(schematized),
+    }
+
+def node_path(path, key):
+    """Name of the node `key` of the graph at `path` (a tuple of keys) from the
+    root graph, eg `order.sorted`
+    """
+
+    return ".".join(str(k) for k in path + (key,))
+
+def bind_caches(canonical, schematized, path=()):
+    """Bind the cache of each node in `schematized` to the node's full path
+    and the fingerprint of its function, so nodes of different graphs, or
+    different versions of a node, never share results
+    """
+
+    for k, v in schematized.items():
+        if "cache" in v:
+            v["cache"] = bind(v["cache"], node_path(path, k),
+                              fingerprint(canonical[k]))
+
+def compile_nodes(g, keys, plan_cache_size=128, codegen=False, path=()):
+    """Compile and schematize the nodes of `g` named in `keys`, where `g` is at
+    `path` from the root graph. Returns the pair `(canonical, schematized)`
+    """
+
+    canonical = { k: compile_graph(g[k], plan_cache_size=plan_cache_size,
+                                   codegen=codegen, path=path + (k,))
+                  for k in keys }
+    schematized = util.map_vals(schema, canonical)
+    bind_caches(canonical, schematized, path)
+    return canonical, schematized
+
+def compile_graph(g, executor=None, plan_cache_size=128, hooks=None,
+                  codegen=False, flatten=False, path=()):
     if not isinstance(g, dict):
         return g
     else:
-        canonical = util.map_vals(compile_graph, g)
-        schematized = util.map_vals(schema, canonical)
-        deps = dependencies(schematized)
-        topo = topological(deps)[::-1]
+        canonical, schematized = compile_nodes(g, g, plan_cache_size, codegen,
+                                               path)
+        values, thunks = link(schematized, plan_cache_size, codegen)
+        return assemble(canonical, values, thunks, executor, plan_cache_size,
+                        hooks, codegen, flatten, path)
+
+def recompile(fn, g, changed):
+    """Recompile the graph `g`, previously compiled as `fn`, after the nodes
+    named in `changed` were added, replaced or deleted. Only those nodes are
+    compiled again, and only they and the nodes depending on them are
+    reordered and re-indexed. Returns a new compiled graph
+    """
+
+    previous = fn._schema
+    executor, plan_cache_size, hooks, codegen, flatten, path = fn._options
+    removed = { k for k in changed if k not in g }
+    changed = set(changed) - removed
+
+    canonical, schematized = compile_nodes(g, changed, plan_cache_size,
+                                           codegen, path)
+    canonical = util.merge(previous["graph"], canonical)
+    schematized = util.merge(previous["schema"], schematized)
+    deps = dict(previous["direct_dependencies"])
+    for k in removed:
+        canonical.pop(k, None)
+        schematized.pop(k, None)
+        deps.pop(k, None)
+    for k in changed:
+        deps[k] = set(schematized[k]["required"])
+
+    index = previous["index"].copy()
+    index.update(deps, changed, removed, lambda d: topological(d)[::-1])
+    values, thunks = link(schematized, plan_cache_size, codegen, deps, index)
+    return assemble(canonical, values, thunks, executor, plan_cache_size,
+                    hooks, codegen, flatten, path)
 
-        topo_trans = { k: [e for e in topo if e in v]
-                       for k, v in transitive(deps).iteritems() }
-        required = set(util.concat1(deps.values())) - set(deps)
-        optional = util.merge(*[v["optional"] for v in schematized.values()])
-        nodes = set(deps)
+def graph_hooks(fn, hooks=None):
+    """The hooks of the compiled graph `fn` combined with the per-call
+    `hooks`, or None if there are neither
+    """
 
-        def _graphfn(_env=None, _keys=None, _prune_keys=False, **kwargs):
-            if _env is None:
-                _env = {}
-            _env = util.merge(_env, kwargs)
+    options = getattr(fn, "_options", None)
+    return combine(options[2] if options else None, hooks)
 
-            if required - set(_env):
-                raise ValueError("Unmet graph requirements!")
+def assemble(canonical, values, thunks, executor=None, plan_cache_size=128,
+             hooks=None, codegen=False, flatten=False, path=()):
+    """Build the compiled graph function over the `canonical` nodes, given the
+    linked schema entries `values` and `thunks` (see `link`). `path` is where
+    the graph is from the root graph
+    """
 
-            if _keys is None:
-                _keys = set(deps)
-                needed = nodes
+    schematized = values["schema"]
+    deps = values["direct_dependencies"]
+    required = set(util.concat1(deps.values())) - set(deps)
+    optional = util.merge(*[v["optional"] for v in schematized.values()])
+
+    runnable, paths = None, ()
+    if flatten and any(hasattr(v, "_schema") for v in canonical.values()):
+        from graffiti.flatten import flat_key, nest
+        from graffiti.flatten import flatten as flat_nodes
+        flat, paths = flat_nodes({ "schema": schematized })
+        flat_values, flat_thunks = link(flat, plan_cache_size, codegen)
+        flat_values["graph"] = util.map_vals(lambda v: v["fn"], flat)
+        runnable = util.LazyMapping(flat_values, flat_thunks)
+    if codegen and plan_cache_size:
+        from graffiti.codegen import generated
+    else:
+        generated = None
+
+    def _graphfn(_env=None, _keys=None, _prune_keys=False, _executor=None,
+                 _release=False, _hooks=None, **kwargs):
+        if _env is None:
+            _env = {}
+        _env = util.merge(_env, kwargs)
+
+        if _executor is None:
+            _executor = executor
+        if hooks is not None or _hooks is not None:
+            _hooks = combine(hooks, _hooks)
+
+        counts = keep = narrowed = None
+        if _keys is not None:
+            if paths:
+                _keys = names = { flat_key(k) for k in _keys }
+                known(runnable["index"], names)
             else:
-                _keys = set(_keys)
-                needed = required_keys(_keys, _env, topo_trans)
+                names, narrowed = narrow(schematized, _keys)
+            if _release:
+                keep = names | set(_env)
 
-            strategy = [e for e in topo if e in needed and e not in _env]
-            result = reduce(call_with(schematized), strategy, _env)
+        if generated is not None and _executor is None and \
+                _hooks is None and keep is None and not narrowed:
+            result = generated(runnable, _env, _keys)(_env)
+        else:
+            strategy, narrowed = narrowed_plan(runnable, _env, _keys)
+            nodes = narrowed_nodes(runnable["schema"], narrowed)
+            if keep is not None:
+                counts = release_counts(nodes, strategy, keep)
 
-            if _prune_keys:
-                result = util.select_keys(lambda k, _: k in deps, result)
+            if _executor is None:
+                result = evaluate(nodes, strategy, _env, counts, _hooks)
+            else:
+                result = run_parallel(
+                    nodes, runnable["direct_dependencies"], strategy, _env,
+                    _executor, in_process(runnable, _executor), counts,
+                    _hooks)
 
-            return result
+        if keep is not None:
+            result = util.select_keys(lambda k, _: k in keep, result)
+        if paths and _keys is not None and any(k in paths for k in _keys):
+            result = nest(result, paths)
+        if _prune_keys:
+            result = util.select_keys(lambda k, _: k in deps, result)
+        elif paths:
+            result = util.select_keys(lambda k, _: k not in paths, result)
 
-        _graphfn._schema = {
-            "required": required,
-            "optional": optional,
-            "args": required | set(optional),
-            "fn": _graphfn,
+        return result
 
-            "dependencies": transitive(deps),
-            "direct_dependencies": deps,
-            "dependency_ordering": topo_trans,
-            "schema": schematized,
-            "graph": canonical,
-            "ordering": topo,
-            "nodes": nodes,
-        }
+    values.update({
+        "required": required,
+        "optional": optional,
+        "args": required | set(optional),
+        "fn": _graphfn,
+        "graph": canonical,
+    })
+    _graphfn._schema = util.LazyMapping(values, thunks)
+    _graphfn._options = (executor, plan_cache_size, hooks, codegen, flatten,
+                         path)
+    if runnable is None:
+        runnable = _graphfn._schema
 
-        return _graphfn
+    return _graphfn
@@ -0,0 +1,120 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from graffiti import util
+
+__author__ = "Michael-Keith Bernard"
+
+def join(prefix, key):
+    return key if prefix is None else "{}.{}".format(prefix, key)
+
+def flat_key(key):
+    """The flat key of a requested key, which may be a path tuple"""
+
+    if isinstance(key, tuple):
+        return ".".join(str(k) for k in key)
+    return key
+
+def nest(result, paths):
+    """Move the results of nodes of nested graphs in `result` under their
+    paths, for nested graphs that weren't rebuilt whole. `paths` maps flat keys
+    to path tuples
+    """
+
+    out, partial = dict(result), set()
+    computed = sorted((k for k in paths if k in result),
+                      key=lambda k: len(paths[k]))
+    for key in computed:
+        path, parent = paths[key], out
+        for i, name in enumerate(path[:-1]):
+            if name not in parent:
+                parent[name] = {}
+                partial.add(path[:i + 1])
+            elif path[:i + 1] not in partial:
+                break
+            parent = parent[name]
+        else:
+            parent[path[-1]] = result[key]
+    return out
+
+def renamed(info, resolve):
+    """Schematize the node `info` of a nested graph so that it takes its
+    arguments by their flat names, given by `resolve`. The node function is
+    still called (and cached) with its own argument names
+    """
+
+    params = [(resolve(a), a) for a in info["args"]]
+    return util.merge(info, {
+        "args": [k for k, _ in params],
+        "required": { resolve(a) for a in info["required"] },
+        "optional": { resolve(k): v for k, v in info["optional"].items() },
+        "params": params,
+    })
+
+def assemble(**argmap):
+    return argmap
+
+def assembler(schema, key):
+    """Schematized node rebuilding the result of the nested graph `schema`,
+    found at the path `key`, from the flat results of its nodes
+    """
+
+    params = [(join(key, k), k) for k in schema["schema"]]
+    return {
+        "fn": assemble,
+        "args": [k for k, _ in params],
+        "required": { k for k, _ in params },
+        "optional": {},
+        "params": params,
+    }
+
+def flatten(schema):
+    """Flatten the nested graphs of the compiled `schema` into a single dict of
+    schematized nodes. Nodes of nested graphs are keyed by their dotted path
+    (eg "order.sorted") and each nested graph is rebuilt under its own name
+    from the results of its nodes. Returns the pair `(nodes, paths)` where
+    `paths` maps the keys only present in the flat graph to their paths
+    """
+
+    nodes, paths = {}, {}
+
+    def _walk(schema, prefix, outer, path):
+        local = schema["schema"]
+        resolve = lambda name: join(prefix, name) if name in local \
+            else outer(name)
+
+        for k, info in local.items():
+            key = join(prefix, k)
+            if key in nodes:
+                raise ValueError("Cannot flatten graph, {} is ambiguous".format(
+                    key))
+            if prefix is not None:
+                paths[key] = path + (k,)
+
+            if hasattr(info["fn"], "_schema"):
+                _walk(info["fn"]._schema, key, resolve, path + (k,))
+                nodes[key] = assembler(info["fn"]._schema, key)
+            elif prefix is not None:
+                nodes[key] = renamed(info, resolve)
+            else:
+                nodes[key] = info
+
+    _walk(schema, None, lambda name: name, ())
+    return nodes, paths
@@ -0,0 +1,157 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import sys
+import threading
+from timeit import default_timer
+
+__author__ = "Michael-Keith Bernard"
+
+class Hooks(object):
+    """Callbacks run around each node call. Either subclass and override
+    `before`, `after` and `error`, or pass any of them as functions.
+
+    `path` is the name of the node, with the names of enclosing graphs joined
+    by dots for nodes of nested graphs (eg "order.sorted"). Sizes are the
+    shallow sizes in bytes of the arguments (summed) and of the result, and
+    durations are in seconds.
+    """
+
+    def __init__(self, before=None, after=None, error=None):
+        if before is not None:
+            self.before = before
+        if after is not None:
+            self.after = after
+        if error is not None:
+            self.error = error
+
+    def before(self, path, arg_size):
+        pass
+
+    def after(self, path, duration, arg_size, result_size):
+        pass
+
+    def error(self, path, duration, arg_size, exc):
+        pass
+
+    def scoped(self, prefix):
+        """Hooks reporting to these ones, with paths prefixed by `prefix`"""
+
+        return Scoped(self, str(prefix))
+
+class Scoped(Hooks):
+    def __init__(self, hooks, prefix):
+        self.hooks = hooks
+        self.prefix = prefix
+
+    def _path(self, path):
+        return "{}.{}".format(self.prefix, path)
+
+    def before(self, path, arg_size):
+        self.hooks.before(self._path(path), arg_size)
+
+    def after(self, path, duration, arg_size, result_size):
+        self.hooks.after(self._path(path), duration, arg_size, result_size)
+
+    def error(self, path, duration, arg_size, exc):
+        self.hooks.error(self._path(path), duration, arg_size, exc)
+
+    def scoped(self, prefix):
+        return Scoped(self.hooks, self._path(prefix))
+
+class Combined(Hooks):
+    def __init__(self, *hooks):
+        self.hooks = hooks
+
+    def before(self, path, arg_size):
+        for h in self.hooks:
+            h.before(path, arg_size)
+
+    def after(self, path, duration, arg_size, result_size):
+        for h in self.hooks:
+            h.after(path, duration, arg_size, result_size)
+
+    def error(self, path, duration, arg_size, exc):
+        for h in self.hooks:
+            h.error(path, duration, arg_size, exc)
+
+class Collector(Hooks):
+    """Hooks aggregating the calls of each node. See `stats`"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _record(self, path, duration, failed):
+        with self._lock:
+            calls = self._calls.setdefault(path, [0, 0.0, 0.0, 0])
+            calls[0] += 1
+            calls[1] += duration
+            calls[2] = max(calls[2], duration)
+            calls[3] += failed
+
+    def after(self, path, duration, arg_size, result_size):
+        self._record(path, duration, 0)
+
+    def error(self, path, duration, arg_size, exc):
+        self._record(path, duration, 1)
+
+    def stats(self):
+        """The count, total, mean and max duration and the number of errors of
+        the calls to each node path
+        """
+
+        with self._lock:
+            return { path: {
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "max": longest,
+                "errors": errors,
+            } for path, (count, total, longest, errors) in self._calls.items() }
+
+    def clear(self):
+        with self._lock:
+            self._calls.clear()
+
+def combine(*hooks):
+    """Combine hooks, ignoring Nones. Returns None if there are none left"""
+
+    hooks = [h for h in hooks if h is not None]
+    if not hooks:
+        return None
+    return hooks[0] if len(hooks) == 1 else Combined(*hooks)
+
+def hook_before(hooks, path, argmap):
+    """Report the start of a call to `hooks`. Returns the state to pass to
+    `hook_after` or `hook_error`
+    """
+
+    arg_size = sum(sys.getsizeof(v) for v in argmap.values())
+    hooks.before(path, arg_size)
+    return default_timer(), arg_size
+
+def hook_after(hooks, path, started, res):
+    start, arg_size = started
+    hooks.after(path, default_timer() - start, arg_size, sys.getsizeof(res))
+
+def hook_error(hooks, path, started, exc):
+    start, arg_size = started
+    hooks.error(path, default_timer() - start, arg_size, exc)
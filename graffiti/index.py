@@ -0,0 +1,238 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+__author__ = "Michael-Keith Bernard"
+
+def bits(mask):
+    """Yield the positions of the set bits in `mask`, lowest first"""
+
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class DependencyIndex(object):
+    """Integer-indexed dependency information for a compiled graph. Every node
+    and input is assigned a bit, and each node's direct and transitive
+    dependencies are stored as integer bitmasks. Bits are stable: `update`
+    only ever adds new ones
+    """
+
+    def __init__(self, deps, order):
+        self.ids, self.names = {}, []
+        for k in order:
+            self._add(k)
+        for k in order:
+            for d in deps[k]:
+                self._add(d)
+
+        ids = self.ids
+        self._link(order, { ids[k]: [ids[d] for d in deps[k]] for k in order })
+
+    def _link(self, order, direct):
+        """Build the masks of the nodes in `order`, given the ids of their
+        direct dependencies by id
+        """
+
+        self.order = list(order)
+        self.position = { k: i for i, k in enumerate(order) }
+        self.nodes = self.mask(order)
+        self.direct = [0] * len(self.names)
+        self.closure = [0] * len(self.names)
+        self.users = [0] * len(self.names)
+        self.refs = [0] * len(self.names)
+
+        used = 0
+        for k in order:
+            i = self.ids[k]
+            trans = 0
+            for d in direct[i]:
+                trans |= 1 << d
+                self.users[d] |= 1 << i
+                self.refs[d] += 1
+            self.direct[i] = trans
+            used |= trans
+            for d in bits(trans & self.nodes):
+                trans |= self.closure[d]
+            self.closure[i] = trans
+        self.inputs = used & ~self.nodes
+
+    def __getstate__(self):
+        """Pickle only the names, the order and the direct dependencies, which
+        are linear in size. The masks are rebuilt in one pass over the order
+        """
+
+        return {
+            "names": self.names,
+            "order": self.order,
+            "direct": { self.ids[k]: list(bits(self.direct[self.ids[k]]))
+                        for k in self.order },
+        }
+
+    def __setstate__(self, state):
+        self.names = state["names"]
+        self.ids = { k: i for i, k in enumerate(self.names) }
+        self._link(state["order"], state["direct"])
+
+    def _add(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            for column in ("direct", "closure", "users", "refs"):
+                if hasattr(self, column):
+                    getattr(self, column).append(0)
+
+    def copy(self):
+        """A copy of this index that can be updated independently"""
+
+        other = object.__new__(DependencyIndex)
+        other.__dict__.update(self.__dict__)
+        for attr in ("ids", "position"):
+            setattr(other, attr, dict(getattr(self, attr)))
+        for attr in ("names", "order", "direct", "closure", "users", "refs"):
+            setattr(other, attr, list(getattr(self, attr)))
+        return other
+
+    def update(self, deps, changed, removed=(), order=None):
+        """Re-index after the nodes in `changed` were added or replaced and the
+        ones in `removed` deleted, given the new direct dependencies `deps`.
+        Only the changed nodes and the nodes depending on them are reordered
+        (after everything else, using `order(region deps)` to sort them) and
+        have their closures recomputed
+        """
+
+        touched = 0
+        for k in set(changed) | set(removed):
+            self._add(k)
+            i = self.ids[k]
+            old = self.direct[i] if self.nodes >> i & 1 else 0
+            new = 0
+            if k in changed:
+                for d in deps[k]:
+                    self._add(d)
+                new = self.mask(deps[k])
+            for d in bits(old & ~new):
+                self.users[d] &= ~(1 << i)
+                self.refs[d] -= 1
+            for d in bits(new & ~old):
+                self.users[d] |= 1 << i
+                self.refs[d] += 1
+            self.direct[i] = new
+            if k in changed:
+                self.nodes |= 1 << i
+            else:
+                self.nodes &= ~(1 << i)
+                self.closure[i] = 0
+            touched |= old | new | 1 << i
+
+        for i in bits(touched):
+            if self.refs[i] and not self.nodes >> i & 1:
+                self.inputs |= 1 << i
+            else:
+                self.inputs &= ~(1 << i)
+
+        region, frontier = 0, self.mask(changed) | self.mask(removed)
+        while frontier:
+            region |= frontier
+            found = 0
+            for i in bits(frontier):
+                found |= self.users[i]
+            frontier = found & ~region
+        region &= self.nodes
+
+        names = self.keys(region)
+        local = { k: { d for d in deps[k] if d in names } for k in names }
+        ordered = order(local) if order else sorted(names)
+        gone = self.mask(removed) | region
+        self.order = [k for k in self.order
+                      if not gone >> self.ids[k] & 1] + list(ordered)
+
+        start = max(self.position.values() or [-1]) + 1
+        for k in removed:
+            self.position.pop(k, None)
+        for n, k in enumerate(ordered):
+            self.position[k] = start + n
+            i = self.ids[k]
+            trans = self.direct[i]
+            for d in bits(trans & self.nodes):
+                trans |= self.closure[d]
+            self.closure[i] = trans
+
+    def mask(self, keys):
+        """Bitmask of the known names in `keys`"""
+
+        ids, acc = self.ids, 0
+        for k in keys:
+            if k in ids:
+                acc |= 1 << ids[k]
+        return acc
+
+    def keys(self, mask):
+        """Set of names whose bits are set in `mask`"""
+
+        return { self.names[i] for i in bits(mask) }
+
+    def missing(self, given):
+        """Names of the graph inputs not present in the `given` mask"""
+
+        return self.keys(self.inputs & ~given)
+
+    def required_keys(self, requested, given, direct=None):
+        """Mask of the keys needed to produce `requested`, not evaluating the
+        dependencies of nodes that are already `given`. `direct` optionally
+        overrides the direct dependency masks of some nodes, by id
+        """
+
+        required = self.mask(requested)
+        if direct is None:
+            closure = 0
+            for i in bits(required & self.nodes):
+                closure |= self.closure[i]
+
+            if not closure & given & self.nodes:
+                return required | closure
+            direct = {}
+
+        frontier = required & self.nodes & ~given
+        while frontier:
+            found = 0
+            for i in bits(frontier):
+                found |= direct.get(i, self.direct[i])
+            found &= ~required
+            required |= found
+            frontier = found & self.nodes & ~given
+        return required
+
+    def strategy(self, mask):
+        """The nodes in `mask` in evaluation order"""
+
+        names = (self.names[i] for i in bits(mask & self.nodes))
+        return sorted(names, key=self.position.get)
+
+    def dependencies(self):
+        """Transitive dependencies of every node, as sets of names"""
+
+        return { k: self.keys(self.closure[self.ids[k]]) for k in self.order }
+
+    def dependency_ordering(self):
+        """Transitive node dependencies of every node, in evaluation order"""
+
+        return { k: self.strategy(self.closure[self.ids[k]])
+                 for k in self.order }
@@ -0,0 +1,114 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import threading
+
+from graffiti import core
+from graffiti import util
+from graffiti.util import Mapping
+
+__author__ = "Michael-Keith Bernard"
+
+class LazyResult(Mapping):
+    """Read-only mapping over the result of applying `graph` to `env`. Each
+    node is evaluated, along with its transitive dependencies, the first time
+    it is accessed and then memoized. Nested graphs are returned as nested
+    `LazyResult`s. `force` evaluates everything and returns a plain dict. Each
+    node call is reported to the graph's hooks and `hooks`
+    """
+
+    def __init__(self, graph, env, prune=False, hooks=None):
+        self._schema = graph._schema
+        self._hooks = core.graph_hooks(graph, hooks)
+        self._env = util.merge(env)
+        self._prune = prune
+        self._views = {}
+        self._lock = threading.RLock()
+        core.plan(self._schema, self._env)
+
+    def _compute(self, keys):
+        strategy = core.plan(self._schema, self._env, keys)
+        core.evaluate(self._schema["schema"], strategy, self._env,
+                      hooks=self._hooks)
+
+    def _view(self, key):
+        node = self._schema["schema"][key]
+        if key not in self._views:
+            nodes = self._schema["nodes"]
+            self._compute([d for d in node["args"] if d in nodes])
+            argmap = core.select_args(node, self._env)
+            hooks = None
+            if self._hooks is not None:
+                hooks = self._hooks.scoped(key)
+            self._views[key] = LazyResult(node["fn"], argmap, True, hooks)
+        return self._views[key]
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._env:
+                return self._env[key]
+            if key not in self._schema["nodes"]:
+                raise KeyError(key)
+            if hasattr(self._schema["schema"][key]["fn"], "_schema"):
+                return self._view(key)
+            self._compute([key])
+            return self._env[key]
+
+    def __iter__(self):
+        nodes = self._schema["nodes"]
+        if not self._prune:
+            for k in self._env:
+                if k not in nodes:
+                    yield k
+        for k in nodes:
+            yield k
+
+    def __len__(self):
+        nodes = self._schema["nodes"]
+        if self._prune:
+            return len(nodes)
+        return len(nodes) + sum(1 for k in self._env if k not in nodes)
+
+    def __contains__(self, key):
+        return key in self._schema["nodes"] or (
+            not self._prune and key in self._env)
+
+    def computed(self):
+        """The set of nodes evaluated so far"""
+
+        with self._lock:
+            return set(self._env) & self._schema["nodes"]
+
+    def force(self):
+        """Evaluate every remaining node and return the result as a dict"""
+
+        with self._lock:
+            for key, view in self._views.items():
+                self._env[key] = view.force()
+            self._views.clear()
+            self._compute(None)
+
+            if self._prune:
+                nodes = self._schema["nodes"]
+                return util.select_keys(lambda k, _: k in nodes, self._env)
+            return dict(self._env)
+
+    def __repr__(self):
+        return "LazyResult(computed={})".format(sorted(self.computed()))
@@ -20,7 +20,7 @@
 from pprint import pformat
 
 from graffiti.legacy.core import compile_graph, run_graph
-from graffiti.legacy.keys import desimplify
+from graffiti.legacy.keys import desimplify, split_table
 
 __author__ = "Michael-Keith Bernard"
 __all__ = ["Graph", "compile_graph", "run_graph"]
@@ -28,6 +28,8 @@ __all__ = ["Graph", "compile_graph", "run_graph"]
 class Graph(object):
     def __init__(self, descriptor):
         self.graph = compile_graph(descriptor)
+        self._paths = split_table(self.graph["node_names"] |
+                                  self.graph["optional_inputs"])
 
     @property
     def descriptor(self):
@@ -57,8 +59,9 @@ class Graph(object):
     def node_names(self):
         return self.graph["node_names"]
 
-    def __call__(self, inputs, *keys):
-        return desimplify(run_graph(self.graph, inputs, *keys))
+    def __call__(self, inputs, *keys, **options):
+        return desimplify(run_graph(self.graph, inputs, *keys, **options),
+                          table=self._paths)
 
     def __repr__(self):
         return "Graph({})".format(pformat(self.graph))
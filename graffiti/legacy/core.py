@@ -105,7 +105,7 @@ def call_graph(graph, key, inputs):
 
     node = graph["nodes"][key]
     acceptable = node["required"] | set(node["optional"])
-    req = util.select_keys(lambda k, _: k in acceptable, inputs)
+    req = { k: inputs[k] for k in acceptable if k in inputs }
     args = util.merge(node["optional"], req)
 
     return node["fn"](**args)
@@ -124,18 +124,66 @@ def run_once(graph, inputs, required=None):
     new_vals = { k: call_graph(graph, k, inputs) for k in sat }
     return util.merge(inputs, new_vals)
 
-def run_graph(graph, inputs, *keys):
+def in_degrees(nodes, keys, given):
+    """Count the required arguments each node in `keys` is still waiting for,
+    given the keys in `given`, and map each node to the nodes waiting on it.
+    Nodes missing an argument that no node in `keys` provides wait forever
+    """
+
+    todo = { k for k in keys if k in nodes and k not in given }
+    waiting, dependents = {}, {}
+    for k in todo:
+        n = 0
+        for d in nodes[k]["required"]:
+            if d not in given:
+                n += 1
+                if d in todo:
+                    dependents.setdefault(d, []).append(k)
+        waiting[k] = n
+
+    return waiting, dependents
+
+def run_wave(graph, wave, inputs, executor=None):
+    """Evaluate all nodes in `wave` with the same `inputs`, concurrently if an
+    `executor` is given
+    """
+
+    if executor is None:
+        return { k: call_graph(graph, k, inputs) for k in wave }
+
+    futures = { k: executor.submit(call_graph, graph, k, inputs) for k in wave }
+    return { k: f.result() for k, f in futures.items() }
+
+def run_graph(graph, inputs, *keys, **options):
     """Run a graph given a set of inputs and, optionally, a subset of keys from
-    the graph
+    the graph. Nodes are evaluated in waves, each made of the nodes whose
+    required arguments the previous waves provided. Pass `executor` (eg a
+    `concurrent.futures` pool) to evaluate the nodes of each wave concurrently
     """
 
+    executor = options.pop("executor", None)
+    if options:
+        raise TypeError("Unexpected options: {}".format(
+            ", ".join(sorted(options))))
+
     if inputs is None:
         inputs = {}
 
     required = strategy.find_requirements(graph, inputs, keys)
-
-    runner = lambda inputs: run_once(graph, inputs, required)
-    solved = util.fixpoint(runner, inputs)
+    solved = dict(inputs)
+
+    waiting, dependents = in_degrees(graph["nodes"], required, solved)
+    wave = [k for k, n in waiting.items() if not n]
+    while wave:
+        results = run_wave(graph, wave, solved, executor)
+        solved.update(results)
+
+        wave = []
+        for k in results:
+            for d in dependents.get(k, []):
+                waiting[d] -= 1
+                if not waiting[d]:
+                    wave.append(d)
 
     if set(solved) < required:
         raise GraphError("Unsatisfiable dependencies")
@@ -29,25 +29,80 @@ def expand_key(key, value, separator="__"):
     path = key.split(separator)
     return util.assoc_in({}, path, value)
 
-def expand_keys(d, separator="__"):
-    """Uses expand_key to expand all keys in `d`"""
+def split_table(keys, separator="__"):
+    """Map each of `keys` to its path, eg 'foo<separator>bar' to
+    ['foo', 'bar']. Pass it to `expand_keys` to avoid splitting known keys
+    again
+    """
+
+    return { k: k.split(separator) for k in keys }
+
+def expand_keys(d, separator="__", table=None):
+    """Uses expand_key to expand all keys in `d`, merging the results as
+    `util.deep_merge` would. Values are inserted into a single trie of nested
+    dicts in one pass; dicts from `d` are only copied when a later key is
+    merged into them. `table` optionally maps keys to their split paths
+    """
 
-    expanded = [expand_key(k, v, separator) for k, v in d.iteritems()]
     acc = {}
-    for exp in expanded:
-        acc = util.deep_merge_with(lambda _, v: v, acc, exp)
+    owned = { id(acc) }
+    for k, v in d.items():
+        path = table.get(k) if table is not None else None
+        if path is None:
+            path = k.split(separator)
+        node = acc
+        for p in path[:-1]:
+            node = _child(node, p, owned)
+        _insert(node, path[-1], v, owned)
     return acc
 
-def desimplify(coll, separator="__", recursive=False):
+def _child(node, key, owned):
+    """The dict at `key` in `node`, replacing anything else by a new dict and
+    copying dicts we don't own yet
+    """
+
+    child = node.get(key)
+    if util.is_dict(child) and id(child) in owned:
+        return child
+
+    child = dict(child) if util.is_dict(child) else {}
+    owned.add(id(child))
+    node[key] = child
+    return child
+
+def _insert(node, key, value, owned):
+    """Put `value` at `key` in `node`, deep merging it into an existing dict"""
+
+    if util.is_dict(value) and util.is_dict(node.get(key)):
+        child = _child(node, key, owned)
+        for k, v in value.items():
+            _insert(child, k, v, owned)
+    else:
+        node[key] = value
+
+def desimplify(coll, separator="__", recursive=False, table=None):
     """Applies expand_keys to all dicts in `coll`. If recursive is True, walks
-    coll recursively and applies expand_keys to all sub dicts"""
+    coll recursively and applies expand_keys to all sub dicts. `table` is
+    passed to expand_keys for `coll` itself"""
 
     if recursive:
-        return util.prewalk(lambda e: expand_keys(e, separator)
-                                      if util.is_dict(e) else e, coll)
+        return _desimplify_all(coll, separator, table)
     else:
-        return expand_keys(coll, separator)
+        return expand_keys(coll, separator, table)
 
+def _desimplify_all(coll, separator, table=None):
+    """Like `util.prewalk` over expand_keys: expands each dict, then walks its
+    values. Tuples become lists, as with `util.walk`
+    """
+
+    if util.is_dict(coll):
+        expanded = expand_keys(coll, separator, table)
+        return { k: _desimplify_all(v, separator)
+                 for k, v in expanded.items() }
+    elif isinstance(coll, (list, tuple)):
+        return [_desimplify_all(e, separator) for e in coll]
+    else:
+        return coll
 
 def simplify(d, separator="__"):
     """Flatten nested dicts
@@ -57,15 +112,15 @@ def simplify(d, separator="__"):
         {"a__b": 1}
     """
 
+    acc = {}
+
     def _simplifier(d, prefix):
-        acc = {}
-        for k, v in d.iteritems():
-            name = separator.join(prefix + [k])
+        for k, v in d.items():
+            name = prefix + k
             if isinstance(v, dict):
-                acc = util.merge(acc, _simplifier(v, prefix + [k]))
+                _simplifier(v, name + separator)
             else:
                 acc[name] = v
-        return acc
-
-    return _simplifier(d, [])
 
+    _simplifier(d, "")
+    return acc
@@ -20,8 +20,6 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from operator import or_
-
 from graffiti import util
 
 def satisfied_by(nodes, inputs):
@@ -38,19 +36,47 @@ def requirements_for(nodes, key, init=None):
     initial state `init`
     """
 
-    def _search(state, path):
-        if key in state:
-            return [path]
+    return requirements(nodes, [key], init)
+
+def requirements(nodes, keys, init=None):
+    """Find the smallest set of requirements to evaluate all of `keys` given an
+    optional initial state `init`: the nodes they transitively require, up to
+    the keys already in `init`. Found by walking dependencies back from `keys`,
+    so it takes time linear in the size of the result
+    """
 
-        opts = satisfied_by(nodes, state) - state
-        paths = (_search(state | { opt }, path + [opt]) for opt in opts)
-        return util.concat(*[p for p in paths])
+    given = set(init or [])
+    required, stack = set(), [k for k in keys if k not in given]
+    while stack:
+        k = stack.pop()
+        if k in required:
+            continue
+        if k not in nodes:
+            raise ValueError("Unsatisfiable dependencies")
+        required.add(k)
+        stack.extend(d for d in nodes[k]["required"] if d not in given)
 
-    requirements = _search(set(init or []), [])
-    if not requirements:
+    if not acyclic(nodes, required):
         raise ValueError("Unsatisfiable dependencies")
+    return required
+
+def acyclic(nodes, keys):
+    """True if the nodes in `keys` can be evaluated in some order"""
+
+    waiting, dependents = {}, {}
+    for k in keys:
+        deps = nodes[k]["required"] & keys
+        waiting[k] = len(deps)
+        for d in deps:
+            dependents.setdefault(d, []).append(k)
 
-    return set(min(requirements, key=len))
+    ready = [k for k, n in waiting.items() if not n]
+    for k in ready:
+        for d in dependents.get(k, []):
+            waiting[d] -= 1
+            if not waiting[d]:
+                ready.append(d)
+    return len(ready) == len(keys)
 
 def find_requirements(graph, inputs, keys=None):
     """Find requirements for graph"""
@@ -58,8 +84,8 @@ def find_requirements(graph, inputs, keys=None):
     in_set = set(inputs)
 
     if keys:
-        reqs = [requirements_for(graph["nodes"], key, in_set) for key in keys]
+        reqs = requirements(graph["nodes"], keys, in_set)
     else:
-        reqs = [set(graph["nodes"])]
+        reqs = set(graph["nodes"])
 
-    return reduce(or_, reqs) | in_set
+    return reqs | in_set
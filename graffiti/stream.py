@@ -0,0 +1,138 @@
+# Copyright (c) 2014 Michael-Keith Bernard
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from graffiti import core
+from graffiti import util
+from graffiti.hooks import hook_after, hook_before, hook_error
+
+__author__ = "Michael-Keith Bernard"
+
+def stream(graph, inputs, _keys=None, _prune_keys=False, _executor=None,
+           window=16, _hooks=None):
+    """Lazily apply `graph` to each input dict from the (possibly unbounded)
+    iterable `inputs`, yielding results in input order.
+
+    Without an executor records are evaluated one at a time. With one, up to
+    `window` records are in flight at once and nodes from different records
+    are scheduled on the same pool, so later records' nodes run while earlier
+    records finish. New records are only pulled from `inputs` as results are
+    consumed, which keeps memory bounded by `window`. Each node call is
+    reported to the graph's hooks and `_hooks`
+    """
+
+    if _executor is None:
+        for env in inputs:
+            yield graph(_env=env, _keys=_keys, _prune_keys=_prune_keys,
+                        _hooks=_hooks)
+        return
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    schema = graph._schema
+    nodes, deps = schema["schema"], schema["direct_dependencies"]
+    local = core.in_process(schema, _executor)
+    hooks = core.graph_hooks(graph, _hooks)
+    records = iter(inputs)
+    inflight, finished, running, started = {}, {}, {}, {}
+    admitted = emitted = 0
+    exhausted = False
+
+    def _admit(seq, env):
+        env = util.merge(env)
+        strategy, narrowed = core.narrowed_plan(schema, env, _keys)
+        waiting, dependents = core.ready_queue(strategy, deps)
+        inflight[seq] = {
+            "env": env,
+            "nodes": core.narrowed_nodes(nodes, narrowed),
+            "waiting": waiting,
+            "dependents": dependents,
+            "ready": [k for k in strategy if not waiting[k]],
+            "remaining": len(strategy),
+        }
+
+    def _complete(seq, key, res):
+        if hooks is not None:
+            hook_after(hooks, key, started.pop((seq, key)), res)
+        rec = inflight[seq]
+        rec["env"][key] = res
+        rec["remaining"] -= 1
+        for k in rec["dependents"].get(key, []):
+            rec["waiting"][k] -= 1
+            if not rec["waiting"][k]:
+                rec["ready"].append(k)
+
+    while True:
+        while not exhausted and len(inflight) + len(finished) < window:
+            try:
+                env = next(records)
+            except StopIteration:
+                exhausted = True
+                break
+            _admit(admitted, env)
+            admitted += 1
+
+        for seq in sorted(inflight):
+            rec = inflight[seq]
+            while rec["ready"]:
+                key = rec["ready"].pop()
+                node = rec["nodes"][key]
+                argmap = core.select_args(node, rec["env"])
+                if hooks is None:
+                    future, cache_key, res = core.dispatch(
+                        node, argmap, _executor, key in local)
+                else:
+                    started[seq, key] = hook_before(hooks, key, argmap)
+                    try:
+                        future, cache_key, res = core.dispatch(
+                            node, argmap, _executor, key in local,
+                            hooks.scoped(key))
+                    except Exception as e:
+                        hook_error(hooks, key, started.pop((seq, key)), e)
+                        raise
+                if future is None:
+                    _complete(seq, key, res)
+                else:
+                    running[future] = (seq, key, cache_key)
+            if not rec["remaining"]:
+                finished[seq] = inflight.pop(seq)["env"]
+
+        while emitted in finished:
+            res = finished.pop(emitted)
+            if _prune_keys:
+                res = util.select_keys(lambda k, _: k in schema["nodes"], res)
+            emitted += 1
+            yield res
+
+        if not running:
+            if exhausted and not inflight and not finished:
+                return
+            continue
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            seq, key, cache_key = running.pop(future)
+            try:
+                res = future.result()
+            except Exception as e:
+                if hooks is not None:
+                    hook_error(hooks, key, started.pop((seq, key)), e)
+                raise
+            core.cache_store(inflight[seq]["nodes"][key], cache_key, res)
+            _complete(seq, key, res)
@@ -19,10 +19,17 @@
 
 import copy
 import inspect
-from functools import partial
+from functools import partial, reduce
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 __author__ = "Michael-Keith"
 
+_getargspec = getattr(inspect, "getfullargspec", None) or inspect.getargspec
+
 def identity(e):
     """The identity function, returns `e` exactly"""
 
@@ -38,8 +45,8 @@ def fninfo(fn):
     Returns the tuple `(required arguments, optional arguments)`
     """
 
-    args, varargs, keywords, defaults = inspect.getargspec(fn)
-    defaults = defaults or []
+    spec = _getargspec(fn)
+    args, defaults = spec[0], spec[3] or []
 
     required = args[:-len(defaults)] if defaults else args
     optional = dict(zip(args[-len(defaults):], defaults))
@@ -117,14 +124,14 @@ def group_by(fn, l):
 def select_keys(fn, d):
     """Returns a new dict with keys where the predicate function is truthy"""
 
-    return { k: v for k, v in d.iteritems() if fn(k, v) }
+    return { k: v for k, v in d.items() if fn(k, v) }
 
 def mapkv(fn, d):
     """Apply `fn` to each k/v pair of `d`
     `fn` should return a new (k, v) pair
     """
 
-    return dict(fn(k, v) for k, v in d.iteritems())
+    return dict(fn(k, v) for k, v in d.items())
 
 def map_keys(fn, d):
     """Applies `fn` to all keys of `d`
@@ -168,7 +175,7 @@ def merge_with(fn, *dicts):
     """Merge 2 or more dicts, using `fn` for conflicting values"""
 
     def _merge(d1, d2):
-        for k, v in d2.iteritems():
+        for k, v in d2.items():
             if k in d1:
                 d1[k] = fn(d1[k], v)
             else:
@@ -204,7 +211,7 @@ def walk(inner, outer, coll):
     if isinstance(coll, list):
         return outer([inner(e) for e in coll])
     elif isinstance(coll, dict):
-        return outer(dict([inner(e) for e in coll.iteritems()]))
+        return outer(dict([inner(e) for e in coll.items()]))
     elif isinstance(coll, tuple):
         return outer([inner(e) for e in coll])
     else:
@@ -215,3 +222,33 @@ def prewalk(fn, coll):
 
     return walk(partial(prewalk, fn), identity, fn(coll))
 
+
+class LazyMapping(Mapping):
+    """A read-only mapping of `values`, plus entries in `thunks` which are
+    computed by calling the thunk on first access
+    """
+
+    def __init__(self, values, thunks):
+        self._values = dict(values)
+        self._thunks = dict(thunks)
+        self._keys = list(self._values) + [k for k in self._thunks
+                                           if k not in self._values]
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = self._thunks[key]()
+            return value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._values or key in self._thunks
+
+    def __repr__(self):
+        return repr(dict(self))
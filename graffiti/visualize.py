@@ -31,7 +31,7 @@ def to_graphviz(graph, transitive=False, path=None):
         deps = graph["direct_dependencies"]
 
     nodes, edges, subgraphs = [], [], {}
-    for k, v in graph["schema"].iteritems():
+    for k, v in graph["schema"].items():
         if hasattr(v["fn"], "_schema"):
             subgraphs[k] = to_graphviz(v["fn"]._schema, transitive, path + [k])
         else:
@@ -51,26 +51,41 @@ def format_edge(graph, node, path):
 
     args = list(graph["schema"][node]["required"])
     kwargs = ["{}={}".format(k, v) for k, v in
-              graph["schema"][node]["optional"].iteritems()]
+              graph["schema"][node]["optional"].items()]
     node_name = ".".join(path + [node])
 
     return "{}[{}]".format(node_name, ", ".join(args + kwargs), )
 
-def draw_graph(dot, graph, dep_data, include_args=True):
+def draw_graph(dot, graph, dep_data, include_args=True, report=None):
+    path = report["critical_path"] if report else []
+    critical, critical_edges = set(path), set(zip(path[1:], path))
     for node in dep_data["nodes"]:
         fmt = format_edge(graph, node, dep_data["path"]) if include_args else node
-        dot.add_node(Node(node, label=fmt))
+        attrs = {}
+        if report:
+            fmt = "{}\\n{:.3g}s".format(fmt, report["times"][node])
+        if node in critical:
+            attrs["color"] = "red"
+        dot.add_node(Node(node, label=fmt, **attrs))
 
     for a, b in dep_data["edges"]:
-        dot.add_edge(Edge(a, b))
+        attrs = { "color": "red" } if (a, b) in critical_edges else {}
+        dot.add_edge(Edge(a, b, **attrs))
 
-    for k, v in dep_data["subgraphs"].iteritems():
-        draw_graph(dot, graph["schema"][k], v, include_args)
+    for k, v in dep_data["subgraphs"].items():
+        sub = report["subgraphs"][k] if report else None
+        draw_graph(dot, graph["schema"][k], v, include_args, sub)
 
     return dot
 
-def visualize(graph, filename="graph.png", include_args=True, transitive=False):
+def visualize(graph, filename="graph.png", include_args=True, transitive=False,
+              report=None):
+    """Draw `graph` to `filename`. If `report` (see `graffiti.analyze`) is
+    given, nodes are labelled with their times and the critical path is
+    highlighted
+    """
+
     dep_data = to_graphviz(graph, transitive)
     dot = Dot(graph_type="digraph")
-    draw_graph(dot, graph, dep_data, include_args)
+    draw_graph(dot, graph, dep_data, include_args, report)
     dot.write_png(filename)
@@ -0,0 +1,132 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from nose.plugins.skip import SkipTest
+from nose.tools import raises
+
+if sys.version_info < (3, 5):
+    raise SkipTest("asyncio evaluation requires Python 3.5+")
+
+import asyncio
+
+from graffiti import Graph, Collector, LRUCache
+
+def run(graph, *args, **kwargs):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(graph.acall(*args, **kwargs))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def later(value, delay=0.01):
+    return asyncio.sleep(delay, result=value)
+
+def test_acall_matches_call():
+    graph = Graph({
+        "n": lambda xs: len(xs),
+        "m": lambda xs, n: sum(xs) / n,
+        "order": { "sorted": lambda xs: sorted(xs) },
+    })
+    inputs = { "xs": [3, 1, 2] }
+    assert run(graph, inputs) == graph(inputs)
+    assert run(graph, inputs, _keys={"n"}) == graph(inputs, _keys={"n"})
+
+def test_acall_awaits_coroutine_nodes():
+    graph = Graph({
+        "a": lambda n: later(n + 1),
+        "b": lambda a: a * 10,
+        "sub": { "c": lambda b: later(b + 1) },
+    })
+    res = run(graph, n=1)
+    assert res == { "n": 1, "a": 2, "b": 20, "sub": { "c": 21 } }
+
+def test_acall_runs_siblings_concurrently():
+    events = {}
+
+    def meet(me, other):
+        events.setdefault(me, asyncio.Event()).set()
+        return asyncio.wait_for(
+            events.setdefault(other, asyncio.Event()).wait(), 1)
+
+    graph = Graph({
+        "a": lambda n: meet("a", "b"),
+        "b": lambda n: meet("b", "a"),
+    })
+    res = run(graph, n=1)
+    assert res["a"] and res["b"]
+
+def test_acall_sync_nodes_in_executor():
+    graph = Graph({ "a": lambda n: n + 1, "b": lambda a: later(a * 2) })
+    with ThreadPoolExecutor(2) as pool:
+        assert run(graph, n=1, _executor=pool)["b"] == 4
+
+@raises(RuntimeError)
+def test_acall_propagates_errors():
+    def boom(n):
+        raise RuntimeError("boom")
+    run(Graph({ "a": boom, "b": lambda n: later(1) }), n=1)
+
+@raises(ValueError)
+def test_acall_unmet_requirements():
+    run(Graph({ "a": lambda n: n }))
+
+def test_acall_caches_awaited_results():
+    calls = []
+    def fetch(n):
+        calls.append(n)
+        return later(n * 2)
+    graph = Graph()
+    graph.add_node("a", fetch, cache=LRUCache())
+    assert run(graph, n=1)["a"] == 2
+    assert run(graph, n=1)["a"] == 2
+    assert calls == [1]
+
+def test_acall_reports_to_hooks():
+    collector, calls = Collector(), Collector()
+    graph = Graph({
+        "a": lambda n: later(n + 1),
+        "b": lambda a: a * 10,
+        "sub": { "c": lambda b: later(b + 1) },
+    }, hooks=collector)
+    run(graph, n=1, _hooks=calls)
+    assert set(collector.stats()) == { "a", "b", "sub", "sub.c" }
+    assert set(calls.stats()) == { "a", "b", "sub", "sub.c" }
+    assert collector.stats()["a"]["total"] >= 0.01
+
+def test_acall_reports_errors_to_hooks():
+    def boom(a):
+        raise RuntimeError("boom")
+    collector = Collector()
+    graph = Graph({ "a": lambda n: later(n), "b": boom }, hooks=collector)
+    try:
+        run(graph, n=1)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    stats = collector.stats()
+    assert stats["a"]["errors"] == 0
+    assert stats["b"]["errors"] == 1
+
+def test_acall_narrows_nested_graphs():
+    calls = []
+    def track(name, value):
+        calls.append(name)
+        return value
+    graph = Graph({
+        "sub": {
+            "x": lambda n: track("x", n + 1),
+            "y": lambda n: track("y", n + 2),
+        },
+    })
+    res = run(graph, n=1, _keys={ "sub.x" })
+    assert res["sub"] == { "x": 2 }
+    assert calls == ["x"]
+
+def test_acall_whole_graph_consumer():
+    graph = Graph({
+        "order": { "a": lambda n: n - 1, "b": lambda n: n + 1 },
+        "top": lambda order: order["b"],
+    })
+    res = run(graph, n=1, _keys={ "top", "order.a" })
+    assert res["top"] == 2
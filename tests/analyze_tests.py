@@ -0,0 +1,75 @@
+from graffiti import Graph, Collector
+from graffiti import visualize
+
+graph = Graph({
+    "n": lambda xs: len(xs),
+    "m": lambda xs, n: sum(xs) / n,
+    "m2": lambda xs, n: sum(x ** 2 for x in xs) / n,
+    "v": lambda m, m2: m2 - m ** 2,
+    "order": {
+        "sorted": lambda xs: sorted(xs),
+        "reversed": lambda sorted: sorted[::-1],
+    },
+})
+
+timings = {
+    "n": 1.0, "m": 2.0, "m2": 4.0, "v": 1.0,
+    "order.sorted": 3.0, "order.reversed": 1.0,
+}
+
+def test_critical_path():
+    report = graph.analyze(timings)
+    assert report["critical_path"] == ["n", "m2", "v"]
+    assert report["makespan"] == 6.0
+    assert report["work"] == 12.0
+    assert report["parallelism"] == 2.0
+
+def test_levels():
+    report = graph.analyze(timings)
+    assert report["levels"] == [2, 2, 1]
+    assert report["subgraphs"]["order"]["levels"] == [1, 1]
+
+def test_nested_graph_takes_its_critical_path():
+    report = graph.analyze(timings)
+    sub = report["subgraphs"]["order"]
+    assert sub["critical_path"] == ["sorted", "reversed"]
+    assert report["times"]["order"] == sub["makespan"] == 4.0
+
+def test_nested_graph_timing_wins():
+    report = graph.analyze(dict(timings, order=10.0))
+    assert report["critical_path"] == ["order"]
+    assert report["makespan"] == 10.0
+
+def test_missing_nodes_take_no_time():
+    report = graph.analyze({ "m": 1.0 })
+    assert report["critical_path"] == ["n", "m", "v"]
+    assert report["makespan"] == 1.0
+
+def test_collector_stats():
+    collector = Collector()
+    graph({ "xs": [1, 2, 3] }, _hooks=collector)
+    stats = collector.stats()
+    report = graph.analyze(stats)
+    assert report["times"]["m"] == stats["m"]["mean"]
+    assert report["work"] >= report["makespan"] > 0
+
+def test_annotated_graphviz():
+    schema = graph._schema
+    report = graph.analyze(timings)
+    dot = visualize.Dot(graph_type="digraph")
+    visualize.draw_graph(dot, schema, visualize.to_graphviz(schema),
+                         False, report)
+    v = dot.get_node("v")[0]
+    assert v.get("color") == "red"
+    assert v.get("label") == "v\\n1s"
+    assert dot.get_node("m")[0].get("color") is None
+
+def test_graphviz_critical_edges():
+    schema = graph._schema
+    report = graph.analyze(timings)
+    dot = visualize.Dot(graph_type="digraph")
+    visualize.draw_graph(dot, schema, visualize.to_graphviz(schema, True),
+                         False, report)
+    red = { (e.get_source(), e.get_destination()) for e in dot.get_edges()
+            if e.get("color") == "red" }
+    assert red == { ("m2", "n"), ("v", "m2"), ("reversed", "sorted") }
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from nose.tools import raises
+
+from graffiti import Graph, LRUCache, cached
+from graffiti import artifact
+from graffiti.core import compile_graph
+
+def n(xs):
+    return len(xs)
+
+def total(xs):
+    return sum(xs)
+
+def mean(n, total):
+    return float(total) / n
+
+def scaled(mean, k=2):
+    return mean * k
+
+@cached(LRUCache(10))
+def top(xs):
+    return max(xs)
+
+descriptor = {
+    "n": n,
+    "total": total,
+    "mean": mean,
+    "stats": { "scaled": scaled, "top": top },
+    "limit": 10,
+}
+graph = compile_graph(descriptor)
+inputs = { "xs": [1, 2, 3] }
+
+def test_roundtrip():
+    restored = artifact.loads(artifact.dumps(graph))
+    assert restored(inputs) == graph(inputs)
+    assert restored(inputs, _keys={ "mean" }) == graph(inputs, _keys={ "mean" })
+    for k in ("required", "optional", "ordering", "dependencies"):
+        assert restored._schema[k] == graph._schema[k]
+    assert "cache" in restored._schema["schema"]["stats"]["schema"]["top"]
+
+def test_restore_skips_analysis():
+    exported = artifact.export(graph._schema)
+    restored = artifact.restore(exported)
+    assert restored._schema["index"] is exported["index"]
+
+def test_changed_function_recompiles():
+    exported = artifact.export(graph._schema)
+    exported["nodes"]["mean"]["fingerprint"] = "stale"
+    restored = artifact.restore(exported)
+    assert restored._schema["index"] is not exported["index"]
+    assert restored(inputs) == graph(inputs)
+
+def test_changed_defaults_recompile():
+    exported = artifact.export(graph._schema)
+    exported["nodes"]["stats"]["graph"]["nodes"]["scaled"]["optional"] = \
+        { "k": 3 }
+    restored = artifact.restore(exported)
+    assert restored(inputs)["stats"]["scaled"] == 4.0
+
+@raises(ValueError)
+def test_lambdas_cant_be_exported():
+    artifact.dumps(compile_graph({ "a": lambda x: x }))
+
+def test_graph_save_load():
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "graph.bin")
+        g = Graph(descriptor)
+        g.save(path)
+        restored = Graph.load(path, codegen=True)
+        assert restored(inputs) == g(inputs)
+        restored.add_node("double", lambda total: total * 2)
+        assert restored(inputs)["double"] == 12
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,60 @@
+from nose.tools import raises
+
+from graffiti import Graph, Collector
+from graffiti.batch import batched, column, map_graph
+
+calls = []
+
+@batched
+def total(xs):
+    calls.append(len(xs))
+    return [sum(x) for x in xs]
+
+descriptor = {
+    "len": lambda xs: len(xs),
+    "total": total,
+    "mean": lambda len, total: float(total) / len,
+    "scaled": lambda mean, m=1: mean * m,
+    "sub": {
+        "double": batched(lambda scaled: [2 * s for s in scaled]),
+    },
+}
+graph = Graph(descriptor)
+records = [{ "xs": [1, 2, 3] }, { "xs": [4, 5] }, { "xs": [6], "m": 2 }]
+
+def test_map_matches_call():
+    assert graph.map(records) == [graph(r) for r in records]
+
+def test_map_keys():
+    res = graph.map(records, _keys={ "mean" })
+    assert res == [graph(r, _keys={ "mean" }) for r in records]
+    assert "sub" not in res[0]
+
+def test_map_batches_per_group():
+    del calls[:]
+    graph.map(records * 10)
+    assert sorted(calls) == [10, 20]
+
+def test_batch_node_in_single_call():
+    assert graph(xs=[1, 2])["sub"] == { "double": 3.0 }
+
+def test_map_empty():
+    assert graph.map([]) == []
+
+def test_column_numpy_optional():
+    assert column([1, 2], "list") == [1, 2]
+    assert list(column([1, 2], "numpy")) == [1, 2]
+
+@raises(ValueError)
+def test_batch_length_mismatch():
+    map_graph(Graph({ "a": batched(lambda x: [1]) })._schema["fn"],
+              [{ "x": 1 }, { "x": 2 }])
+
+def test_map_reports_to_hooks():
+    collector, calls = Collector(), Collector()
+    g = Graph(descriptor, hooks=collector)
+    assert g.map(records, _hooks=calls) == [graph(r) for r in records]
+    for stats in (collector.stats(), calls.stats()):
+        assert stats["len"]["count"] == len(records)
+        assert stats["total"]["count"] == 2
+        assert stats["sub"]["count"] == stats["sub.double"]["count"] == 2
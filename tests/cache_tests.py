@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from graffiti import cache
+
+def test_lru_get_set():
+    c = cache.LRUCache(2)
+    c["a"] = 1
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    assert c.get("b", 10) == 10
+    assert (c.hits, c.misses) == (1, 2)
+
+def test_lru_evicts_least_recent():
+    c = cache.LRUCache(2)
+    c["a"] = 1
+    c["b"] = 2
+    c.get("a")
+    c["c"] = 3
+    assert "a" in c and "c" in c
+    assert "b" not in c
+    assert c.stats["evictions"] == 1
+    assert len(c) == 2
+
+def test_lru_clear():
+    c = cache.LRUCache(2)
+    c["a"] = 1
+    c.clear()
+    assert len(c) == 0
+
+def test_lru_unbounded():
+    c = cache.LRUCache(None)
+    for i in range(1000):
+        c[i] = i
+    assert len(c) == 1000
+
+def test_ttl_expires():
+    now = [0]
+    c = cache.TTLCache(10, timer=lambda: now[0])
+    c["a"] = 1
+    assert c.get("a") == 1
+    now[0] = 10
+    assert c.get("a") is None
+    assert c.stats["evictions"] == 1
+    assert (c.hits, c.misses) == (1, 1)
+
+def test_argument_key():
+    assert cache.argument_key({ "b": 2, "a": 1 }) == (("a", 1), ("b", 2))
+    assert (cache.argument_key({ "xs": [1, 2] }) ==
+            cache.argument_key({ "xs": [1, 2] }))
+    assert (cache.argument_key({ "xs": [1, 2] }) !=
+            cache.argument_key({ "xs": [1, 3] }))
+
+def test_cached_decorator():
+    c = cache.LRUCache()
+    fn = lambda x: x
+    node = cache.cached(c)(fn)
+    assert node.cache is c and node.fn is fn
+    assert node(1) == 1 and not hasattr(fn, "cache")
+
+def make_store(**kwargs):
+    return cache.DirectoryStore(tempfile.mkdtemp(), **kwargs)
+
+def test_directory_store_roundtrip():
+    store = make_store()
+    node = store.bind("total")
+    key = cache.argument_key({ "xs": [1, 2, 3] })
+    assert node.get(key) is None
+    node[key] = { "result": 6 }
+    assert node.get(key) == { "result": 6 }
+    assert cache.DirectoryStore(store.root).bind("total").get(key) == \
+        { "result": 6 }
+    assert node.stats["hits"] == 1 and node.stats["misses"] == 1
+    shutil.rmtree(store.root)
+
+def test_directory_store_invalidate():
+    store = make_store()
+    store.bind("a")[1] = "a"
+    store.bind("b")[1] = "b"
+    store.invalidate("a")
+    assert store.bind("a").get(1) is None
+    assert store.bind("b").get(1) == "b"
+    shutil.rmtree(store.root)
+
+def test_directory_store_max_bytes():
+    store = make_store(max_bytes=2000)
+    node = store.bind("a")
+    for i in range(20):
+        node[i] = "x" * 500
+    assert store.size() <= 2000
+    assert store.evictions > 0
+    assert node.get(19) == "x" * 500
+    shutil.rmtree(store.root)
+
+def store_value(args):
+    root, i = args
+    cache.DirectoryStore(root).bind("shared")[i % 4] = i % 4
+    return i
+
+def test_directory_store_concurrent_processes():
+    store = make_store()
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(store_value, [(store.root, i) for i in range(40)]))
+    node = store.bind("shared")
+    assert [node.get(i) for i in range(4)] == [0, 1, 2, 3]
+    assert not [f for f in os.listdir(node.directory) if f.endswith(".tmp")]
+    shutil.rmtree(store.root)
+
+def test_tiered_cache_promotes():
+    front, back = cache.LRUCache(), cache.LRUCache()
+    tiered = cache.TieredCache(front, back)
+    back["a"] = 1
+    assert tiered.get("a") == 1
+    assert "a" in front
+    tiered["b"] = 2
+    assert "b" in front and "b" in back
+    assert tiered.get("c") is None
+    assert (tiered.stats["hits"], tiered.stats["misses"]) == (1, 1)
+
+def test_bind():
+    lru = cache.LRUCache()
+    a, b = cache.bind(lru, "a"), cache.bind(lru, "b")
+    a[1] = "a"
+    assert a.get(1) == "a" and b.get(1) is None
+    assert a.stats is not None and len(lru) == 1
+    store = make_store()
+    tiered = cache.bind(cache.TieredCache(lru, store), "a")
+    assert tiered.caches[0].cache is lru
+    assert tiered.caches[1].name == "a"
+    shutil.rmtree(store.root)
+
+def scaled(xs, k):
+    return sum(xs) * k
+
+def test_fingerprint_state():
+    scale = lambda k: lambda xs: sum(xs) * k
+    assert cache.fingerprint(scale(1)) == cache.fingerprint(scale(1))
+    assert cache.fingerprint(scale(1)) != cache.fingerprint(scale(10))
+    assert cache.fingerprint(lambda xs, k=1: k) != \
+        cache.fingerprint(lambda xs, k=2: k)
+    a, b = partial(scaled, k=1), partial(scaled, k=2)
+    assert cache.fingerprint(a)[0] == cache.fingerprint(scaled)[0]
+    assert cache.fingerprint(a) != cache.fingerprint(b)
+    assert cache.fingerprint(partial(scaled, [1])) != \
+        cache.fingerprint(partial(scaled, [2]))
+    lock = threading.Lock()
+    assert cache.fingerprint(lambda: lock)[1] is None
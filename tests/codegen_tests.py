@@ -0,0 +1,60 @@
+from nose.tools import raises
+
+from graffiti import Graph, LRUCache, batched, cached
+from graffiti.codegen import generate
+from graffiti import core
+
+calls = []
+descriptor = {
+    "n": lambda xs: len(xs),
+    "total": lambda xs: sum(xs),
+    "mean": lambda n, total, scale=1: scale * float(total) / n,
+    "squares": cached(LRUCache())(lambda xs: [x ** 2 for x in xs]),
+    "doubled": batched(lambda xs: [[2 * x for x in v] for v in xs]),
+    "order": {
+        "sorted": lambda xs: sorted(xs),
+        "top": lambda sorted, n: sorted[n - 1],
+    },
+}
+plain, generated = Graph(descriptor), Graph(descriptor, codegen=True)
+inputs = { "xs": [3, 1, 2] }
+
+def test_same_results():
+    assert generated(inputs) == plain(inputs)
+
+def test_optional_inputs():
+    res = generated(inputs, scale=2)
+    assert res == plain(inputs, scale=2)
+    assert res["mean"] == 4.0
+
+def test_keys():
+    assert generated(inputs, _keys={ "mean" }) == \
+        plain(inputs, _keys={ "mean" })
+
+def test_given_nodes():
+    res = generated(inputs, n=10, _keys={ "mean" })
+    assert res == { "xs": [3, 1, 2], "n": 10, "total": 6, "mean": 0.6 }
+
+def test_generated_per_plan():
+    g = Graph(descriptor, codegen=True)
+    g(inputs)
+    g({ "xs": [1] })
+    g(inputs, _keys={ "n" })
+    assert g._schema["generated"].stats["misses"] == 2
+    assert g._schema["generated"].stats["hits"] == 1
+
+def test_optional_node_dependency():
+    g = { "a": lambda x: x + 1, "b": lambda x, a=0: x + a }
+    assert Graph(g, codegen=True)(x=1) == Graph(g)(x=1)
+
+def test_generated_source():
+    schema = plain._schema
+    env = dict(inputs)
+    fn = generate(schema, core.plan(schema, env, { "mean" }),
+                  schema["index"].mask(env))
+    assert "call_node" not in fn.source
+    assert fn(env)["mean"] == 2.0
+
+@raises(ValueError)
+def test_unmet_requirements():
+    generated({})
@@ -1,3 +1,4 @@
+from functools import reduce
 from nose.tools import raises
 
 from graffiti import core
@@ -57,3 +58,46 @@ def test_topological():
 def test_cycle_detection():
     g = { "a": {"b"}, "b": {"a"} }
     core.topological(g)
+
+def test_select_args():
+    node = util.fninfo(lambda a, b=1: 1)
+    assert core.select_args(node, { "a": 1, "c": 3 }) == { "a": 1 }
+    assert core.select_args(node, { "a": 1, "b": 2 }) == { "a": 1, "b": 2 }
+
+def test_evaluate_in_place():
+    schema = {
+        "a": util.fninfo(lambda n: n + 1),
+        "b": util.fninfo(lambda a, n: a * n),
+    }
+    env = { "n": 2 }
+    res = core.evaluate(schema, ["a", "b"], env)
+    assert res is env
+    assert res == reduce(core.call_with(schema), ["a", "b"], { "n": 2 })
+
+def test_transitive_diamonds():
+    g = { "n0": {"x"} }
+    for i in range(1, 200):
+        g["a{}".format(i)] = { "n{}".format(i - 1) }
+        g["b{}".format(i)] = { "n{}".format(i - 1) }
+        g["n{}".format(i)] = { "a{}".format(i), "b{}".format(i) }
+    trans = core.transitive(g)
+    assert len(trans["n199"]) == 3 * 199 + 1
+
+def test_topological_deep_chain():
+    g = { "n{}".format(i): { "n{}".format(i - 1) } for i in range(1, 10000) }
+    res = core.topological(g)
+    assert res[0] == "n9999"
+    assert res[-1] == "n1"
+
+def test_cycle_names_nodes():
+    g = { "a": {"b"}, "b": {"c"}, "c": {"a"}, "d": {"a"}, "e": {"x"} }
+    try:
+        core.topological(g)
+    except ValueError as e:
+        cycle = str(e).split(": ")[1].split(" -> ")
+        assert set(cycle) == {"a", "b", "c"}
+        assert cycle[0] == cycle[-1]
+        for k, dep in zip(cycle, cycle[1:]):
+            assert dep in g[k]
+    else:
+        assert False, "cycle not detected"
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from nose.tools import raises
+
+from graffiti import Graph, Collector, LRUCache, cached
+from graffiti.flatten import flatten
+
+calls = []
+descriptor = {
+    "n": lambda xs: len(xs),
+    "total": lambda xs: sum(xs),
+    "mean": lambda n, total: float(total) / n,
+    "order": {
+        "sorted": lambda xs: calls.append("sorted") or sorted(xs),
+        "top": lambda sorted, n, k=1: sorted[n - k],
+        "stats": {
+            "spread": lambda sorted, top: top - sorted[0],
+            "scaled": lambda spread, mean: spread * mean,
+        },
+    },
+    "best": lambda order: order["top"] * 10,
+}
+nested = Graph(descriptor)
+inputs = { "xs": [3, 1, 2] }
+
+def test_flat_keys():
+    nodes, paths = flatten(nested._schema)
+    assert set(paths) == { "order.sorted", "order.top", "order.stats",
+                      "order.stats.spread", "order.stats.scaled" }
+    assert set(nodes) == set(paths) | { "n", "total", "mean", "order", "best" }
+    assert paths["order.stats.spread"] == ("order", "stats", "spread")
+    assert nodes["order.stats.spread"]["required"] == {
+        "order.sorted", "order.top" }
+    assert nodes["order.stats.scaled"]["required"] == {
+        "order.stats.spread", "mean" }
+    assert nodes["order.top"]["optional"] == { "k": 1 }
+
+def test_same_results():
+    flat = Graph(descriptor, flatten=True)
+    assert flat(inputs) == nested(inputs)
+    assert flat(inputs, k=2) == nested(inputs, k=2)
+    assert flat(inputs, _keys={ "best" }) == nested(inputs, _keys={ "best" })
+
+def test_same_results_with_executor_and_codegen():
+    flat = Graph(descriptor, flatten=True, codegen=True)
+    assert flat(inputs) == nested(inputs)
+    assert flat(inputs, k=2) == nested(inputs, k=2)
+    with ThreadPoolExecutor(4) as pool:
+        assert flat(inputs, _executor=pool) == nested(inputs)
+
+def test_nested_graph_objects():
+    g = Graph({ "n": lambda xs: len(xs), "sub": Graph({ "m": lambda n: n + 1 }) })
+    assert Graph(g.graph, flatten=True)(inputs) == g(inputs)
+
+def test_interleaves_with_parent_nodes():
+    flat = Graph(descriptor, flatten=True)
+    assert "order.stats.scaled" not in flat.nodes
+    collector = Collector()
+    flat(inputs, _hooks=collector)
+    assert set(collector.stats()) >= { "mean", "order.stats.scaled" }
+
+def test_node_caches():
+    count = []
+    fn = cached(LRUCache())(lambda xs: count.append(1) or sorted(xs))
+    flat = Graph({ "order": { "sorted": fn } }, flatten=True)
+    flat(inputs)
+    flat(inputs)
+    assert len(count) == 1
+
+@raises(ValueError)
+def test_ambiguous_paths():
+    Graph({ "a.b": lambda x: x, "a": { "b": lambda x: x } }, flatten=True)(x=1)
+
+@raises(ValueError)
+def test_unmet_requirements():
+    Graph(descriptor, flatten=True)({})
+
+@raises(KeyError)
+def test_unknown_flat_key():
+    Graph(descriptor, flatten=True)(inputs, _keys={ "order.typo" })
@@ -1,6 +1,16 @@
+import os
+import shutil
+import tempfile
+import warnings
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from nose.tools import raises
 
-from graffiti.core import compile_graph
+from graffiti import (Graph, LRUCache, TieredCache, DirectoryStore, Hooks,
+                      Collector, cached)
+from graffiti import core
+from graffiti import util
+from graffiti.core import compile_graph, local_nodes
 
 descriptor = {
     "len": lambda xs: len(xs),
@@ -144,3 +154,400 @@ def test_raw_values():
         "e": [1, "two", [1, 2, 3], {4}]
     }
 
+
+def test_executor_matches_serial():
+    with ThreadPoolExecutor(4) as pool:
+        assert graph(_env=inputs, _executor=pool) == graph(_env=inputs)
+        assert (graph(_env=inputs, _keys={"mean"}, _executor=pool) ==
+                graph(_env=inputs, _keys={"mean"}))
+
+def test_executor_overlaps_siblings():
+    started = Event()
+    desc = {
+        "n": lambda: 1,
+        "m": lambda n: started.wait(5),
+        "m2": lambda n: started.set(),
+    }
+    with ThreadPoolExecutor(2) as pool:
+        res = compile_graph(desc, executor=pool)()
+    assert res["m"]
+
+@raises(RuntimeError)
+def test_executor_propagates_errors():
+    def boom(n):
+        raise RuntimeError("boom")
+    with ThreadPoolExecutor(2) as pool:
+        compile_graph({ "a": boom })(n=1, _executor=pool)
+
+def sum_squares(xs):
+    return sum(x * x for x in xs)
+
+def test_process_pool_offloads_picklable():
+    desc = {
+        "len": lambda xs: len(xs),
+        "ss": sum_squares,
+        "sub": { "a": lambda ss: ss * 2 },
+    }
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with ProcessPoolExecutor(2) as pool:
+            g = compile_graph(desc)
+            res = g(xs=xs, _executor=pool)
+            assert g(xs=xs, _executor=pool) == res
+
+    assert is_subdict(res, { "len": 10, "ss": 285, "sub": { "a": 570 } })
+    assert len(caught) == 1
+    assert "len, sub" in str(caught[0].message)
+
+def test_local_nodes():
+    desc = { "a": lambda xs: 1, "b": sum_squares, "c": 1, "d": { "e": 1 } }
+    assert local_nodes(compile_graph(desc)._schema["schema"]) == {"a", "c", "d"}
+
+def test_plan_cache_hits():
+    graph = compile_graph(descriptor)
+    plans = graph._schema["plans"]
+    graph(_env=inputs, _keys={ "mean" })
+    graph(_env={ "xs": [1], "unrelated": 1 }, _keys={ "mean" })
+    assert (plans.hits, plans.misses) == (1, 1)
+
+    graph(_env=inputs, _keys={ "len" })
+    graph(_env=util.merge(inputs, { "len": 1 }), _keys={ "mean" })
+    assert (plans.hits, plans.misses) == (1, 3)
+
+def test_plan_cache_warm():
+    graph = Graph(descriptor)
+    graph.warm({ "sub" }, { "xs" })
+    res = graph(inputs, _keys={ "sub" })
+    assert graph.plan_stats["hits"] == 1
+    assert res["sub"] == { "a": 90, "a2": 180 }
+
+def test_plan_cache_disabled():
+    graph = compile_graph(descriptor, plan_cache_size=0)
+    assert graph._schema["plans"] is None
+    assert is_subdict(graph(_env=inputs), { "len": 10 })
+
+def test_plan_stats_without_plan_cache():
+    graph = Graph(descriptor)
+    graph._compiled = compile_graph(descriptor, plan_cache_size=None)
+    assert graph(inputs)["len"] == 10
+    assert graph.plan_stats is None
+
+def test_given_node_keeps_shared_dependencies():
+    desc = {
+        "a": lambda x: x + 1,
+        "b": lambda a: a * 2,
+        "c": lambda a: a * 3,
+        "d": lambda b, c: b + c,
+    }
+    res = compile_graph(desc)(x=1, c=0, _keys={ "d" })
+    assert res == { "x": 1, "a": 2, "b": 4, "c": 0, "d": 4 }
+
+def test_lazy_schema_views():
+    schema = compile_graph(descriptor)._schema
+    assert schema["dependencies"]["mean"] == { "len", "sum", "xs" }
+    assert set(schema["dependency_ordering"]["mean"]) == { "len", "sum" }
+    assert "dependencies" in schema and "index" in dict(schema)
+
+@raises(ValueError)
+def test_unmet_names_inputs():
+    try:
+        compile_graph(descriptor)(m=1)
+    except ValueError as e:
+        assert "xs" in str(e)
+        raise
+
+def test_node_cache():
+    calls = []
+    g = Graph({ "n": lambda xs: len(xs) })
+
+    @g.node("total", cache=LRUCache(2))
+    def total(xs, n):
+        calls.append(xs)
+        return sum(xs) * n
+
+    assert g(xs=[1, 2])["total"] == 6
+    assert g(xs=[1, 2])["total"] == 6
+    assert g(xs=[1, 2, 3])["total"] == 18
+    assert len(calls) == 2
+    assert g.cache_stats == { "total": {
+        "hits": 1, "misses": 2, "evictions": 0, "size": 2, "maxsize": 2 } }
+
+def test_node_decorator_cache():
+    g = Graph()
+    def total(xs):
+        return sum(xs)
+    assert g.node(total, cache=LRUCache(4)) is total
+    assert g(xs=[1, 2])["total"] == 3
+    assert g(xs=[1, 2])["total"] == 3
+    assert g.cache_stats["total"]["hits"] == 1
+
+def test_node_cache_with_executor():
+    calls = []
+    def slow(x):
+        calls.append(x)
+        return x * 2
+    desc = { "a": cached(LRUCache())(slow), "sub": { "b": lambda a: a + 1 } }
+    graph = compile_graph(desc)
+    with ThreadPoolExecutor(2) as pool:
+        assert graph(x=1, _executor=pool)["sub"] == { "b": 3 }
+        assert graph(x=1, _executor=pool)["sub"] == { "b": 3 }
+    assert calls == [1]
+
+restart_calls = []
+
+def restart_total(xs):
+    restart_calls.append(xs)
+    return sum(xs)
+
+def test_persistent_node_cache_warm_restart():
+    root = tempfile.mkdtemp()
+    calls, total = restart_calls, restart_total
+    del calls[:]
+
+    for _ in range(2):
+        store = DirectoryStore(root)
+        g = Graph()
+        g.add_node("total", total, cache=TieredCache(LRUCache(), store))
+        assert g(xs=[1, 2, 3])["total"] == 6
+    assert len(calls) == 1
+
+    store.invalidate("total")
+    assert Graph({ "total": cached(DirectoryStore(root))(total) })(
+        xs=[1, 2, 3])["total"] == 6
+    assert len(calls) == 2
+    shutil.rmtree(root)
+
+def test_update_recomputes_affected_nodes():
+    calls = []
+    graph = Graph({
+        "len": lambda xs: calls.append("len") or len(xs),
+        "scaled": lambda xs, m=2: calls.append("scaled") or m * sum(xs),
+        "mean": lambda len, scaled: calls.append("mean") or scaled / len,
+        "sub": {
+            "a": lambda len: calls.append("a") or len + 1,
+            "b": lambda scaled: calls.append("b") or scaled + 1,
+            "c": lambda b: calls.append("c") or b + 1,
+        },
+    })
+    previous = graph(xs=[1, 2, 3])
+    del calls[:]
+
+    res = graph.update(previous, { "m": 4 })
+    assert sorted(calls) == ["b", "c", "mean", "scaled"]
+    assert res == graph(xs=[1, 2, 3], m=4)
+
+def test_update_reports_to_hooks():
+    collector = Collector()
+    graph = Graph({
+        "scaled": lambda xs, m=2: m * sum(xs),
+        "sub": { "b": lambda scaled: scaled + 1 },
+    }, hooks=collector)
+    previous = graph(xs=[1, 2, 3])
+    collector.clear()
+    calls = Collector()
+    graph.update(previous, { "m": 4 }, _hooks=calls)
+    assert set(collector.stats()) == set(calls.stats()) == {
+        "scaled", "sub", "sub.b" }
+
+def test_update_leaves_uncomputed_nodes():
+    graph = Graph(descriptor)
+    previous = graph(inputs, _keys={ "len" })
+    res = graph.update(previous, { "xs": [1, 2] })
+    assert res == { "xs": [1, 2], "len": 2 }
+
+def test_release_intermediates():
+    res = graph(inputs, _keys={ "mean" }, _release=True)
+    assert res == { "xs": xs, "mean": graph(inputs)["mean"] }
+
+def test_release_drops_values_after_last_consumer():
+    env, seen = { "x": 1 }, []
+    g = compile_graph({
+        "a": lambda x: x + 1,
+        "b": lambda a: a + 1,
+        "c": lambda b: seen.append(sorted(env)) or b + 1,
+        "d": lambda a, c: a + c,
+    })
+    schema = g._schema["schema"]
+    strategy = ["a", "b", "c", "d"]
+    counts = core.release_counts(schema, strategy, { "x", "d" })
+    assert core.evaluate(schema, strategy, env, counts) == { "x": 1, "d": 6 }
+    assert seen == [["a", "b", "x"]]
+
+def test_release_with_executor():
+    with ThreadPoolExecutor(4) as pool:
+        res = graph(inputs, _keys={ "mean", "sub" }, _release=True,
+                    _executor=pool)
+    full = graph(inputs)
+    assert res == util.select_keys(
+        lambda k, _: k in ("xs", "mean", "sub"), full)
+
+def test_release_keeps_everything_without_keys():
+    assert graph(inputs, _release=True) == graph(inputs)
+
+def test_hooks_report_nested_paths():
+    events = []
+    hooks = Hooks(
+        before=lambda path, arg_size: events.append(("before", path)),
+        after=lambda path, duration, arg_size, result_size:
+            events.append(("after", path)))
+    graph(inputs, _hooks=hooks)
+    paths = set(path for _, path in events)
+    assert paths == { "len", "sum", "mean", "inc", "sub", "sub.a", "sub.a2" }
+    assert events.index(("before", "sub")) < events.index(("after", "sub.a"))
+    assert events.index(("after", "sub.a2")) < events.index(("after", "sub"))
+
+def test_hooks_report_sizes_and_errors():
+    calls = []
+    class Recorder(Hooks):
+        def after(self, path, duration, arg_size, result_size):
+            calls.append((path, arg_size > 0, result_size > 0, duration >= 0))
+        def error(self, path, duration, arg_size, exc):
+            calls.append((path, type(exc)))
+    g = Graph({ "n": lambda xs: len(xs), "bad": lambda n: 1 / 0 },
+              hooks=Recorder())
+    try:
+        g(xs=[1, 2])
+        assert False, "expected ZeroDivisionError"
+    except ZeroDivisionError:
+        pass
+    assert calls == [("n", True, True, True), ("bad", ZeroDivisionError)]
+
+def test_collector():
+    collector = Collector()
+    g = compile_graph(descriptor, hooks=collector)
+    g(inputs)
+    g(inputs, _keys={ "sub" })
+    stats = collector.stats()
+    assert stats["inc"]["count"] == 2
+    assert stats["mean"]["count"] == 1
+    assert stats["sub.a2"]["count"] == 2
+    for s in stats.values():
+        assert s["mean"] == s["total"] / s["count"]
+        assert 0 <= s["max"] <= s["total"]
+        assert s["errors"] == 0
+
+def test_collector_with_executor():
+    collector = Collector()
+    with ThreadPoolExecutor(4) as pool:
+        res = graph(inputs, _executor=pool, _hooks=collector)
+    assert res == graph(inputs)
+    assert set(collector.stats()) == {
+        "len", "sum", "mean", "inc", "sub", "sub.a", "sub.a2" }
+
+def test_incremental_recompile():
+    g = Graph()
+    g.add_node("a", lambda x: x + 1)
+    g.add_node("b", lambda a: a * 2)
+    sub = g.subgraph("s")
+    sub.add_node("c", lambda b: b + 1)
+    assert g(x=1)["b"] == 4
+
+    compiled = sub._compiled
+    g.add_node("b", lambda a, y=0: a * 3 + y)
+    g.add_node("d", lambda b, s: b + s["c"])
+    assert g(x=1) == { "x": 1, "a": 2, "b": 6, "s": { "c": 7 }, "d": 13 }
+    assert g._schema["graph"]["s"] is sub
+    assert sub._compiled is compiled
+    assert g.optional == { "y": 0 }
+
+    g.del_node("a")
+    assert g.required == {"a"}
+    assert g(a=1)["d"] == 7
+    assert g.ordering[-2:] == ["s", "d"]
+    assert g.dependencies == compile_graph(g.graph)._schema["dependencies"]
+
+@raises(ValueError)
+def test_incremental_recompile_detects_cycles():
+    g = Graph({ "a": lambda x: x, "b": lambda a: a })
+    g(x=1)
+    g.add_node("a", lambda b: b)
+    g(x=1)
+
+def test_node_cache_leaves_function_alone():
+    calls = []
+    def total(xs):
+        calls.append(xs)
+        return sum(xs)
+
+    g = Graph()
+    g.add_node("cached", total, cache=LRUCache(8))
+    g.add_node("plain", total)
+    g(xs=[1, 2])
+    g(xs=[1, 2])
+    assert len(calls) == 3
+    assert "cache" not in g._schema["schema"]["plain"]
+    assert Graph({ "n": total })(xs=[1])["n"] == 1 and len(calls) == 4
+
+def test_shared_cache_per_node():
+    shared = LRUCache(8)
+    g = Graph()
+    g.add_node("total", lambda xs: sum(xs), cache=shared)
+    g.add_node("top", lambda xs: max(xs), cache=shared)
+    assert g(xs=[1, 2, 3]) == { "xs": [1, 2, 3], "total": 6, "top": 3 }
+    assert g(xs=[1, 2, 3]) == { "xs": [1, 2, 3], "total": 6, "top": 3 }
+    assert g(xs=[1, 2]) == { "xs": [1, 2], "total": 3, "top": 2 }
+    assert g(xs=[1, 2], _keys={ "total" })["total"] == 3
+    stats = g.cache_stats
+    assert (stats["total"]["hits"], stats["total"]["misses"]) == (2, 2)
+    assert (stats["top"]["hits"], stats["top"]["misses"]) == (1, 2)
+    assert stats["total"]["size"] == stats["top"]["size"] == 4
+    assert (shared.stats["hits"], shared.stats["misses"]) == (3, 4)
+
+def test_persistent_cache_per_node_path():
+    root = tempfile.mkdtemp()
+    store = DirectoryStore(root)
+    g = Graph({
+        "p": { "total": cached(store)(lambda xs: sum(xs)) },
+        "q": { "total": cached(store)(lambda xs: max(xs)) },
+    })
+    assert g(xs=[1, 2, 3]) == { "xs": [1, 2, 3], "p": { "total": 6 },
+                                "q": { "total": 3 } }
+
+    sub = Graph()
+    sub.add_node("total", lambda xs: min(xs), cache=store)
+    g = Graph({ "p": sub })
+    assert g(xs=[1, 2, 3])["p"] == { "total": 1 }
+    assert sorted(os.listdir(root))[0].startswith("p.total-")
+    shutil.rmtree(root)
+
+def test_persistent_cache_keyed_by_code():
+    root = tempfile.mkdtemp()
+    store = DirectoryStore(root)
+    assert Graph({ "total": cached(store)(lambda xs: sum(xs)) })(
+        xs=[1, 2])["total"] == 3
+    assert Graph({ "total": cached(store)(lambda xs: sum(xs) * 10) })(
+        xs=[1, 2])["total"] == 30
+    assert Graph({ "total": cached(store)(lambda xs: sum(xs) * 10) })(
+        xs=[1, 2])["total"] == 30
+    shutil.rmtree(root)
+
+def test_persistent_cache_keyed_by_closure_and_defaults():
+    root = tempfile.mkdtemp()
+    store = DirectoryStore(root)
+    scale = lambda k: lambda xs: sum(xs) * k
+    run = lambda fn: Graph({ "total": cached(store)(fn) })(xs=[1, 2])["total"]
+    assert run(scale(1)) == 3
+    assert run(scale(10)) == 30
+    assert run(lambda xs, k=2: sum(xs) * k) == 6
+    assert run(lambda xs, k=3: sum(xs) * k) == 9
+    shutil.rmtree(root)
+
+@raises(ValueError)
+def test_persistent_cache_refuses_unpicklable_closure():
+    lock = Lock()
+    def total(xs):
+        with lock:
+            return sum(xs)
+    root = tempfile.mkdtemp()
+    try:
+        Graph({ "total": cached(DirectoryStore(root))(total) })(xs=[1, 2])
+    finally:
+        shutil.rmtree(root)
+
+@raises(KeyError)
+def test_unknown_key():
+    graph(inputs, _keys={ "typo" })
+
+@raises(KeyError)
+def test_unknown_nested_key():
+    graph(inputs, _keys={ ("sub", "typo") })
@@ -0,0 +1,91 @@
+from nose.tools import raises
+
+from graffiti import core
+from graffiti import util
+from graffiti.index import DependencyIndex, bits
+
+deps = {
+    "a": {"x"},
+    "b": {"a"},
+    "c": {"a", "y"},
+    "d": {"b", "c"},
+}
+order = core.topological(deps)[::-1]
+index = DependencyIndex(deps, order)
+
+def test_bits():
+    assert list(bits(0)) == []
+    assert list(bits(0b10110)) == [1, 2, 4]
+
+def test_mask_roundtrip():
+    assert index.keys(index.mask({"a", "x", "unknown"})) == {"a", "x"}
+    assert index.keys(index.nodes) == {"a", "b", "c", "d"}
+    assert index.keys(index.inputs) == {"x", "y"}
+
+def test_dependencies_match_transitive():
+    assert index.dependencies() == core.transitive(deps)
+
+def test_dependency_ordering():
+    ordering = index.dependency_ordering()
+    assert ordering["a"] == []
+    assert set(ordering["d"]) == {"a", "b", "c"}
+    assert ordering["d"][0] == "a"
+
+def test_missing():
+    assert index.missing(index.mask({"x"})) == {"y"}
+    assert index.missing(index.mask({"x", "y"})) == set()
+
+def test_required_keys():
+    given = index.mask({"x", "y"})
+    assert index.keys(index.required_keys({"b"}, given)) == {"a", "b", "x"}
+
+    given = index.mask({"x", "y", "c"})
+    needed = index.required_keys({"d"}, given)
+    assert index.keys(needed & index.nodes) == {"a", "b", "c", "d"}
+
+    given = index.mask({"x", "y", "b", "c"})
+    assert index.keys(index.required_keys({"d"}, given)) == {"b", "c", "d"}
+
+def test_strategy_in_order():
+    strategy = index.strategy(index.nodes)
+    assert strategy.index("a") < strategy.index("b") < strategy.index("d")
+    assert strategy.index("c") < strategy.index("d")
+
+def test_required_keys_direct_override():
+    direct = { index.ids["c"]: index.mask({"y"}) }
+    assert index.keys(index.required_keys({"d"}, 0, direct)) == \
+        {"a", "b", "c", "d", "x", "y"}
+    assert index.keys(index.required_keys({"c"}, 0, direct)) == {"c", "y"}
+
+def updated(new, changed, removed=()):
+    other = index.copy()
+    other.update(new, changed, removed, lambda d: core.topological(d)[::-1])
+    return other
+
+def test_update_matches_rebuild():
+    new = util.merge(deps, { "b": {"x"}, "e": {"d", "z"} })
+    other = updated(new, {"b", "e"})
+    assert other.dependencies() == core.transitive(new)
+    assert other.keys(other.nodes) == {"a", "b", "c", "d", "e"}
+    assert other.keys(other.inputs) == {"x", "y", "z"}
+    strategy = other.strategy(other.nodes)
+    assert strategy.index("b") < strategy.index("d") < strategy.index("e")
+    assert index.dependencies() == core.transitive(deps)
+
+def test_update_removes_nodes():
+    new = util.merge(deps)
+    del new["a"]
+    other = updated(new, (), {"a"})
+    assert other.keys(other.nodes) == {"b", "c", "d"}
+    assert other.keys(other.inputs) == {"a", "y"}
+    assert other.dependencies() == core.transitive(new)
+
+    del new["b"]
+    new["d"] = {"c"}
+    other = updated(new, {"d"}, {"a", "b"})
+    assert other.keys(other.inputs) == {"a", "y"}
+    assert other.order == other.strategy(other.nodes) == ["c", "d"]
+
+@raises(ValueError)
+def test_update_detects_cycles():
+    updated(util.merge(deps, { "a": {"d"} }), {"a"})
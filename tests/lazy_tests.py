@@ -0,0 +1,66 @@
+from nose.tools import raises
+
+from graffiti import Graph, Collector
+
+calls = []
+graph = Graph({
+    "n": lambda xs: calls.append("n") or len(xs),
+    "total": lambda xs: calls.append("total") or sum(xs),
+    "mean": lambda n, total: calls.append("mean") or float(total) / n,
+    "order": {
+        "sorted": lambda xs: calls.append("sorted") or sorted(xs),
+        "top": lambda sorted, n: calls.append("top") or sorted[n - 1],
+    },
+})
+xs = [3, 1, 2]
+
+def test_lazy_computes_on_access():
+    del calls[:]
+    res = graph.lazy(xs=xs)
+    assert calls == []
+    assert res["n"] == 3
+    assert calls == ["n"]
+    assert res["mean"] == 2.0
+    assert sorted(calls) == ["mean", "n", "total"]
+    res["mean"]
+    assert len(calls) == 3
+
+def test_lazy_nested_view():
+    del calls[:]
+    res = graph.lazy({ "xs": xs })
+    order = res["order"]
+    assert order["sorted"] == [1, 2, 3]
+    assert sorted(calls) == ["n", "sorted"]
+    assert "xs" not in order
+
+def test_lazy_force_matches_call():
+    res = graph.lazy(xs=xs)
+    res["order"]["top"]
+    assert res.force() == graph(xs=xs)
+
+def test_lazy_mapping_interface():
+    res = graph.lazy(xs=xs)
+    assert set(res) == { "xs", "n", "total", "mean", "order" }
+    assert len(res) == 5
+    assert "mean" in res and "nope" not in res
+    assert res.get("nope") is None
+    assert res.computed() == set()
+
+@raises(ValueError)
+def test_lazy_unmet_requirements():
+    graph.lazy()
+
+@raises(TypeError)
+def test_lazy_read_only():
+    graph.lazy(xs=xs)["n"] = 1
+
+def test_lazy_reports_to_hooks():
+    collector, calls = Collector(), Collector()
+    g = Graph(graph.graph, hooks=collector)
+    res = g.lazy(xs=xs, _hooks=calls)
+    assert res["mean"] == 2.0
+    assert set(collector.stats()) == { "n", "total", "mean" }
+    assert res["order"]["top"] == 3
+    assert res.force() == graph(xs=xs)
+    assert set(calls.stats()) == {
+        "n", "total", "mean", "order.sorted", "order.top" }
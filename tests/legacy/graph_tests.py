@@ -1,7 +1,10 @@
-from nose.tools import with_setup
+from concurrent.futures import ThreadPoolExecutor
+from nose.tools import raises, with_setup
 
+from graffiti import util
 from graffiti.legacy import Graph
-from graffiti.legacy.core import compile_graph, run_once, run_graph
+from graffiti.legacy.core import (GraphError, build_nodes, compile_graph,
+                                  run_once, run_graph)
 from graffiti.legacy.keys import desimplify
 
 descriptor = {
@@ -103,3 +106,33 @@ def test_wrapper_graph_properties():
 def test_wrapper_graph_call():
     wrapper = Graph(descriptor)
     assert desimplify(run_graph(graph, inputs)) == wrapper(inputs)
+
+def test_run_matches_fixpoint():
+    for keys in [(), ("mean",), ("dup_a2", "len")]:
+        required = set(graph["nodes"]) | set(inputs)
+        expected = util.fixpoint(lambda env: run_once(graph, env, required),
+                                 inputs)
+        res = run_graph(graph, inputs, *keys)
+        assert is_subdict(expected, res)
+    assert run_graph(graph, inputs) == expected
+
+def test_run_with_executor():
+    with ThreadPoolExecutor(4) as pool:
+        assert run_graph(graph, inputs, executor=pool) == \
+            run_graph(graph, inputs)
+        assert Graph(descriptor)(inputs, "mean", executor=pool) == \
+            Graph(descriptor)(inputs, "mean")
+
+def test_run_deep_chain():
+    desc = { "n{}".format(i): eval("lambda n{}: n{} + 1".format(i - 1, i - 1))
+             for i in range(1, 12001) }
+    chain = { "nodes": build_nodes(desc) }
+    assert run_graph(chain, { "n0": 0 })["n12000"] == 12000
+
+@raises(GraphError)
+def test_run_unsatisfiable():
+    run_graph(graph, {})
+
+@raises(TypeError)
+def test_run_unknown_option():
+    run_graph(graph, inputs, pool=None)
@@ -1,3 +1,4 @@
+from graffiti import util
 from graffiti.legacy import keys
 
 def test_expand_key_default():
@@ -56,3 +57,39 @@ def test_desimplify_recursive():
     nested = keys.desimplify({ "a__b": { "c__d": 1 } }, recursive=True)
     assert nested == { "a": { "b": { "c": { "d": 1 } } }}
 
+
+def reference(d, separator="__"):
+    acc = {}
+    for k, v in d.items():
+        acc = util.deep_merge(acc, keys.expand_key(k, v, separator))
+    return acc
+
+def test_expand_keys_matches_deep_merge():
+    value = { "c": 1, "d__e": 2 }
+    cases = [
+        { "a": 1, "a__b": 2 },
+        { "a__b": 2, "a": 1 },
+        { "a": value, "a__b": 2, "a__c__x": 3 },
+        { "a__b": value, "a__b__d": { "f": 4 }, "g": [1, 2] },
+    ]
+    for d in cases:
+        assert keys.expand_keys(d) == reference(d)
+    assert value == { "c": 1, "d__e": 2 }
+
+def test_expand_keys_table():
+    table = keys.split_table(["a.b", "c"], ".")
+    assert table == { "a.b": ["a", "b"], "c": ["c"] }
+    expanded = keys.expand_keys({ "a.b": 1, "c": 2, "d.e": 3 }, ".", table)
+    assert expanded == { "a": { "b": 1 }, "c": 2, "d": { "e": 3 } }
+
+def test_desimplify_recursive_matches_prewalk():
+    d = { "a__b": { "c__d": 1 }, "e": [{ "f__g": 2 }, (3, { "h__i": 4 })] }
+    expected = util.prewalk(
+        lambda e: keys.expand_keys(e) if util.is_dict(e) else e, d)
+    assert keys.desimplify(d, recursive=True) == expected
+
+def test_simplify_roundtrip():
+    d = { "a": { "b": { "c": 1 }, "d": 2 }, "e": 3, "f": {} }
+    assert keys.simplify(d) == { "a__b__c": 1, "a__d": 2, "e": 3 }
+    assert keys.desimplify(keys.simplify(d)) == \
+        { "a": { "b": { "c": 1 }, "d": 2 }, "e": 3 }
@@ -50,3 +50,20 @@ def test_find_requirements_keys():
     for inputs, keys, out in expected:
         res = strategy.find_requirements(graph, inputs, keys)
         assert res == out
+
+def test_requirements_stop_at_inputs():
+    assert strategy.requirements_for(graph["nodes"], "a", { "b" }) == { "a" }
+    assert strategy.requirements(graph["nodes"], ["a", "c"], { "x" }) == \
+        { "a", "b", "c" }
+
+@raises(ValueError)
+def test_requirements_for_cycle():
+    nodes = core.build_nodes({ "a": lambda b: 1, "b": lambda a, x: 1 })
+    strategy.requirements_for(nodes, "a", { "x" })
+
+def test_requirements_for_wide_graph():
+    desc = { "n__{}".format(i): lambda x: 1 for i in range(200) }
+    desc["total"] = eval("lambda {}: 1".format(
+        ", ".join("n__{}".format(i) for i in range(200))))
+    nodes = core.build_nodes(desc)
+    assert strategy.requirements_for(nodes, "total", { "x" }) == set(desc)
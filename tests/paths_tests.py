@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from nose.tools import raises
+
+from graffiti import Graph
+
+calls = []
+record = lambda name, value: calls.append(name) or value
+descriptor = {
+    "n": lambda xs: record("n", len(xs)),
+    "total": lambda xs: record("total", sum(xs)),
+    "mean": lambda n, total: record("mean", float(total) / n),
+    "order": {
+        "sorted": lambda xs: record("sorted", sorted(xs)),
+        "top": lambda sorted, n: record("top", sorted[n - 1]),
+        "stats": {
+            "spread": lambda sorted, top: record("spread", top - sorted[0]),
+            "scaled": lambda spread, mean: record("scaled", spread * mean),
+        },
+    },
+}
+inputs = { "xs": [3, 1, 2] }
+
+def run(graph, keys, **kwargs):
+    del calls[:]
+    return graph(inputs, _keys=keys, **kwargs)
+
+def check_narrowed(graph):
+    res = run(graph, { ("order", "sorted") })
+    assert res == { "xs": [3, 1, 2], "order": { "sorted": [1, 2, 3] } }
+    assert calls == ["sorted"]
+
+    res = run(graph, { "order.stats.spread" })
+    assert res["order"]["stats"] == { "spread": 2 }
+    assert res["order"]["top"] == 3
+    assert sorted(calls) == ["n", "sorted", "spread", "top"]
+
+    res = run(graph, { ("order", "stats", "scaled"), "order.sorted" })
+    assert res["order"]["stats"]["scaled"] == 4.0
+    assert "mean" in calls and "total" in calls
+
+def test_nested_paths():
+    check_narrowed(Graph(descriptor))
+
+def test_flat_paths():
+    check_narrowed(Graph(descriptor, flatten=True))
+
+def test_flat_paths_with_codegen():
+    check_narrowed(Graph(descriptor, flatten=True, codegen=True))
+
+def test_whole_graph_wins():
+    graph = Graph(descriptor)
+    res = run(graph, { "order", ("order", "sorted") })
+    assert res["order"] == graph(inputs)["order"]
+
+def test_path_with_release():
+    res = run(Graph(descriptor), { ("order", "top") }, _release=True)
+    assert res == { "xs": [3, 1, 2], "order": { "sorted": [1, 2, 3], "top": 3 } }
+
+def test_requirements_are_plan_scoped():
+    graph = Graph({ "n": lambda xs: len(xs), "m": lambda ys: len(ys),
+                    "sub": { "a": lambda xs: 1, "b": lambda ys: 2 } })
+    assert graph(inputs, _keys={ "n" }) == { "xs": [3, 1, 2], "n": 3 }
+    assert graph(inputs, _keys={ "sub.a" }) == { "xs": [3, 1, 2],
+                                                 "sub": { "a": 1 } }
+
+@raises(ValueError)
+def test_unmet_requirements_of_path():
+    Graph({ "sub": { "a": lambda xs: 1, "b": lambda ys: 2 } })(
+        inputs, _keys={ "sub.b" })
+
+@raises(ValueError)
+def test_path_into_plain_node():
+    Graph(descriptor)(inputs, _keys={ ("n", "x") })
+
+def test_whole_graph_consumer_disables_narrowing():
+    desc = {
+        "order": {
+            "a": lambda xs: min(xs),
+            "b": lambda xs: max(xs),
+        },
+        "top": lambda order: order["b"],
+    }
+    keys = { "top", "order.a" }
+    for graph in (Graph(desc), Graph(desc, codegen=True),
+                  Graph(desc, flatten=True)):
+        res = graph(inputs, _keys=keys)
+        assert res["top"] == 3
+        assert res["order"] == { "a": 1, "b": 3 }
+    with ThreadPoolExecutor(2) as pool:
+        assert Graph(desc)(inputs, _keys=keys, _executor=pool)["top"] == 3
+
+def test_map_paths():
+    graph = Graph({ "sub": { "a": lambda xs: len(xs), "b": lambda ys: 2 } })
+    res = graph.map([inputs, { "xs": [1] }], _keys={ "sub.a" })
+    assert res == [graph(e, _keys={ "sub.a" }) for e in (inputs, { "xs": [1] })]
+    assert res[1]["sub"] == { "a": 1 }
+
+def test_stream_paths():
+    graph = Graph({ "sub": { "a": lambda xs: len(xs), "b": lambda ys: 2 } })
+    with ThreadPoolExecutor(2) as pool:
+        res = list(graph.stream([inputs] * 3, _keys={ "sub.a" },
+                                _executor=pool))
+    assert res == [graph(inputs, _keys={ "sub.a" })] * 3
+    assert res[0]["sub"] == { "a": 3 }
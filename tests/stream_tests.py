@@ -0,0 +1,71 @@
+from itertools import count, islice
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+
+from graffiti import Graph, Collector
+
+graph = Graph({
+    "n": lambda xs: len(xs),
+    "total": lambda xs: sum(xs),
+    "sub": { "mean": lambda n, total: float(total) / n },
+})
+records = [{ "xs": list(range(1, i + 2)) } for i in range(20)]
+
+def test_stream_serial():
+    assert list(graph.stream(records)) == [graph(r) for r in records]
+
+def test_stream_executor_preserves_order():
+    with ThreadPoolExecutor(4) as pool:
+        res = list(graph.stream(records, _keys={ "sub" }, _executor=pool,
+                                window=4))
+    assert res == [graph(r, _keys={ "sub" }) for r in records]
+
+def test_stream_is_lazy_and_bounded():
+    pulled = []
+    def inputs():
+        for i in count():
+            pulled.append(i)
+            yield { "xs": [i] }
+
+    with ThreadPoolExecutor(2) as pool:
+        results = graph.stream(inputs(), _executor=pool, window=3)
+        assert [r["total"] for r in islice(results, 5)] == [0, 1, 2, 3, 4]
+    assert len(pulled) <= 5 + 3
+
+def test_stream_pipelines_records():
+    started = Event()
+    g = Graph({
+        "a": lambda i: i == 1 and started.set(),
+        "b": lambda a, i: i != 0 or started.wait(5),
+    })
+    with ThreadPoolExecutor(2) as pool:
+        res = list(g.stream([{ "i": 0 }, { "i": 1 }], _executor=pool))
+    assert res[0]["b"] is True
+
+def test_stream_prune_keys():
+    with ThreadPoolExecutor(2) as pool:
+        res = list(graph.stream(records[:2], _prune_keys=True, _executor=pool))
+    assert "xs" not in res[0]
+
+def test_stream_reports_to_hooks():
+    collector, calls = Collector(), Collector()
+    g = Graph(graph.graph, hooks=collector)
+    with ThreadPoolExecutor(4) as pool:
+        res = list(g.stream(records, _executor=pool, _hooks=calls))
+    assert res == [graph(r) for r in records]
+    for stats in (collector.stats(), calls.stats()):
+        assert set(stats) == { "n", "total", "sub", "sub.mean" }
+        assert stats["sub.mean"]["count"] == len(records)
+        assert stats["n"]["errors"] == 0
+
+def test_stream_reports_errors_to_hooks():
+    collector = Collector()
+    g = Graph({ "n": lambda xs: len(xs), "inv": lambda n: 1.0 / n })
+    with ThreadPoolExecutor(2) as pool:
+        try:
+            list(g.stream([{ "xs": [1] }, { "xs": [] }], _executor=pool,
+                          _hooks=collector))
+            assert False, "expected ZeroDivisionError"
+        except ZeroDivisionError:
+            pass
+    assert collector.stats()["inv"]["errors"] == 1